@@ -0,0 +1,54 @@
+# checks which folder names --consolidate treats as the same folder: spelling
+# variants merge, numbered or otherwise different folders never do, not even into an
+# existing folder. exits 1 if anything doesn't hold.
+#
+#   python benchmarks/consolidation_check.py
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'drive_organizer'))
+
+from folder_consolidation import DEFAULT_SIMILARITY_THRESHOLD, cluster_folder_names, folder_similarity
+
+SAME = [
+    ("Biology Notes", "biology note"),
+    ("Receipts", "Receipt"),
+    ("Biology Course", "Biology Coursework"),
+]
+
+DIFFERENT = [
+    ("Math 101", "Math 102"),
+    ("Physics 101", "Physics 102"),
+    ("2023 Taxes", "2024 Taxes"),
+    ("Spanish I", "Spanish II"),
+    ("History IV", "History V"),
+    ("Delta Stuff", "Beta Stuff"),
+    ("Car", "Careers"),
+]
+
+
+def main():
+    failures = []
+
+    def check(label: str, ok: bool) -> None:
+        print(f"{'✓' if ok else '✗'} {label}")
+        if not ok:
+            failures.append(label)
+
+    for a, b in SAME:
+        check(f"'{a}' and '{b}' merge", folder_similarity(a, b) >= DEFAULT_SIMILARITY_THRESHOLD)
+    for a, b in DIFFERENT:
+        check(f"'{a}' and '{b}' stay apart", folder_similarity(a, b) < DEFAULT_SIMILARITY_THRESHOLD)
+
+    renames = cluster_folder_names({"Math 102": 3, "Physics Notes": 2}, ["Math 101", "Physics Note"])
+    check(f"a new 'Math 102' isn't folded into an existing 'Math 101' ({renames})",
+          renames == {"Physics Notes": "Physics Note"})
+
+    if failures:
+        print(f"\n✗ {len(failures)} check(s) failed")
+        sys.exit(1)
+    print("\n✓ folder consolidation behaves")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# import time of the organizer's entry point, read from `python -X importtime`.
+# fails (exit code 1) when one of the heavy SDKs is loaded just by importing it, or
+# when the import takes longer than the budget, so it can guard against regressions.
+#
+#   python benchmarks/import_benchmark.py [budget in ms]
+import os
+import re
+import subprocess
+import sys
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'drive_organizer')
+
+# packages that should only load once their mode actually runs
+HEAVY_MODULES = (
+    'google.generativeai',
+    'googleapiclient',
+    'google_auth_oauthlib',
+    'google.auth.transport.requests',
+    'dotenv',
+    'asyncio',
+)
+
+DEFAULT_BUDGET_MS = 150
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+
+# {module: (self µs, cumulative µs)} for one fresh interpreter importing `module`
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=SRC, capture_output=True, text=True, check=True
+    ).stderr
+    times = {}
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            times[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return times
+
+
+# best wall time of `organizer.py --help` over a few runs, in milliseconds
+def help_wall_ms(repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, 'organizer.py', '--help'], cwd=SRC, capture_output=True, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_MS
+
+    # the fastest of a few runs, the first one also pays for cold disk caches
+    runs = [import_times('organizer') for _ in range(5)]
+    times = min(runs, key=lambda t: t['organizer'][1])
+    total_ms = times['organizer'][1] / 1000
+
+    print(f"import organizer: {total_ms:.1f} ms (budget {budget_ms:.0f} ms)")
+    print(f"organizer.py --help: {help_wall_ms():.1f} ms wall, including interpreter start\n")
+
+    print("  slowest modules (self time):")
+    for name, (own, _) in sorted(times.items(), key=lambda item: -item[1][0])[:10]:
+        print(f"    {own / 1000:7.2f} ms  {name}")
+
+    loaded = sorted({name for name in times for heavy in HEAVY_MODULES
+                     if name == heavy or name.startswith(heavy + '.')})
+    failed = False
+    if loaded:
+        print(f"\n✗ heavy modules loaded at import: {', '.join(loaded)}")
+        failed = True
+    if total_ms > budget_ms:
+        print(f"\n✗ import took {total_ms:.1f} ms, over the {budget_ms:.0f} ms budget")
+        failed = True
+    if not failed:
+        print("\n✓ no heavy modules loaded, within budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+# end-to-end check of --incremental against an in-memory Drive with a changes feed:
+# the first run lists everything, later runs only see files added since, and a file
+# whose move failed is offered again on the next run. no network or credentials
+# needed; exits 1 if anything doesn't hold.
+#
+#   python benchmarks/incremental_sync_check.py
+import contextlib
+import io
+import itertools
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'drive_organizer'))
+
+import organizer
+from drive_client import MIME_TYPE_FOLDER
+
+ROOT_ID = 'root-folder-id'
+
+
+# stands in for a googleapiclient request
+class FakeRequest:
+    def __init__(self, run):
+        self.run = run
+
+    def execute(self):
+        return self.run()
+
+
+class FakeBatch:
+    def __init__(self, callback):
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id=None):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        for request_id, request in self.requests:
+            try:
+                self.callback(request_id, request.execute(), None)
+            except Exception as e:
+                self.callback(request_id, None, e)
+
+
+# an error the move executor treats as final, like a 404 from Drive
+class FakeHttpError(Exception):
+    class resp:
+        status = 404
+
+
+# Drive with the calls the organizer makes. every write appends the item to `log`,
+# which doubles as the changes feed: a page token is a position in it
+class FakeDrive:
+    def __init__(self):
+        self.items = {}
+        self.log = []
+        self.failing_moves = set()
+        self._ids = itertools.count()
+
+    def add(self, name: str, mime_type: str = 'text/plain', parent: str = ROOT_ID) -> str:
+        file_id = f'id{next(self._ids)}'
+        self.items[file_id] = {'id': file_id, 'name': name, 'mimeType': mime_type, 'parents': [parent]}
+        self._touch(file_id)
+        return file_id
+
+    def _touch(self, file_id: str) -> None:
+        self.log.append(file_id)
+        self.items[file_id]['modifiedTime'] = f'2024-01-01T00:00:{len(self.log):02d}.000Z'
+
+    def in_root(self) -> list[str]:
+        return sorted(f['name'] for f in self.items.values()
+                      if ROOT_ID in f['parents'] and f['mimeType'] != MIME_TYPE_FOLDER)
+
+    def files(self):
+        return FakeFiles(self)
+
+    def changes(self):
+        return FakeChanges(self)
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(callback)
+
+
+class FakeFiles:
+    def __init__(self, drive: FakeDrive):
+        self.drive = drive
+
+    def list(self, q, pageSize, fields, pageToken=None, orderBy=None):
+        items = [dict(f) for f in self.drive.items.values()]
+        if "'root' in parents" in q:
+            items = [f for f in items if ROOT_ID in f['parents']]
+        return FakeRequest(lambda: {'files': items})
+
+    def get(self, fileId, fields):
+        if fileId == 'root':
+            return FakeRequest(lambda: {'id': ROOT_ID})
+        return FakeRequest(lambda: dict(self.drive.items[fileId]))
+
+    def create(self, body, fields):
+        parent = (body.get('parents') or [ROOT_ID])[0]
+        return FakeRequest(lambda: {'id': self.drive.add(body['name'], body['mimeType'], parent)})
+
+    def update(self, fileId, addParents, removeParents, fields):
+        def move():
+            if fileId in self.drive.failing_moves:
+                raise FakeHttpError(f"can't move {fileId}")
+            self.drive.items[fileId]['parents'] = [addParents]
+            self.drive._touch(fileId)
+            return {'id': fileId, 'parents': [addParents]}
+        return FakeRequest(move)
+
+
+class FakeChanges:
+    def __init__(self, drive: FakeDrive):
+        self.drive = drive
+
+    def getStartPageToken(self):
+        return FakeRequest(lambda: {'startPageToken': str(len(self.drive.log))})
+
+    def list(self, pageToken, pageSize, fields, **kwargs):
+        start = int(pageToken)
+        changes = [{'fileId': file_id, 'removed': False, 'file': dict(self.drive.items[file_id])}
+                   for file_id in self.drive.log[start:]]
+        return FakeRequest(lambda: {'changes': changes, 'newStartPageToken': str(len(self.drive.log))})
+
+
+# one approved --incremental run; returns the names of files it moved
+def organize(drive: FakeDrive) -> list[str]:
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        organizer.main(use_mock=True, incremental=True)
+    return sorted(line.split('✓ ', 1)[1].split(' → ')[0] for line in output.getvalue().splitlines()
+                  if line.startswith('  ✓ ') and ' → ' in line)
+
+
+def main():
+    drive = FakeDrive()
+    organizer.get_credentials = lambda: None
+    organizer.LazyDriveService = lambda creds: drive
+    organizer.interactive_review = lambda plan: plan
+
+    failures = []
+
+    def check(label: str, actual, expected) -> None:
+        ok = actual == expected
+        print(f"{'✓' if ok else '✗'} {label}: {actual}")
+        if not ok:
+            failures.append(label)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        drive.add('Invoices', MIME_TYPE_FOLDER)
+        drive.add('invoice march.pdf')
+        check("first run moves the loose files", organize(drive), ['invoice march.pdf'])
+
+        drive.add('invoice april.pdf')
+        drive.failing_moves.add(drive.add('invoice may.pdf'))
+        check("next run only sees the new files", organize(drive), ['invoice april.pdf'])
+        check("a failed move stays in root", drive.in_root(), ['invoice may.pdf'])
+
+        drive.failing_moves.clear()
+        check("the failed file is offered again", organize(drive), ['invoice may.pdf'])
+        check("then there is nothing left", organize(drive), [])
+
+    if failures:
+        print(f"\n✗ {len(failures)} check(s) failed")
+        sys.exit(1)
+    print("\n✓ incremental sync behaves")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# memory per file of an organization plan: one ClassificationResult object per file
+# kept in per-folder dicts (how plans used to be stored) against the columnar
+# OrganizationPlan. measured with tracemalloc over synthetic results, once with the
+# few repeated reasonings the mock classifier and rules give and once with a unique
+# reasoning per file like the AI gives.
+#
+#   python benchmarks/plan_memory_benchmark.py [files]
+import os
+import random
+import string
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'drive_organizer'))
+
+from mock_classifier import ClassificationResult, CONFIDENCE_LABELS
+from organizer import OrganizationPlan
+
+FOLDERS = [f"Folder {i}" for i in range(60)]
+RULE_REASONINGS = [f"Matched pattern 'keyword{i}' in filename" for i in range(40)]
+ROOT_PARENTS = ['0AExampleRootFolderIdXXXXXXX']
+
+
+# results as the classifier hands them over, built lazily so only the plan holds them
+def synthetic_results(count: int, unique_reasoning: bool, seed: int = 1):
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits + '-_'
+    for i in range(count):
+        folder = rng.choice(FOLDERS)
+        yield ClassificationResult(
+            file_id="1" + "".join(rng.choices(alphabet, k=32)),
+            file_name=f"document_{i}_{rng.choice(['report', 'notes', 'invoice', 'photo'])}.pdf",
+            suggested_folder=folder,
+            is_new_folder=False,
+            confidence=rng.choice(CONFIDENCE_LABELS),
+            reasoning=(f"The file name suggests it belongs with other {folder} material (#{i})"
+                       if unique_reasoning else rng.choice(RULE_REASONINGS)),
+            parents=list(ROOT_PARENTS),
+            modified_time=f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T10:00:00.000Z"
+        )
+
+
+# the previous layout: folder -> {ordinal: result}, plus the id and ordinal indexes
+def object_plan(results) -> dict:
+    folders, files, ordinals = {}, [], {}
+    for result in results:
+        ordinals[result.file_id] = len(files)
+        folders.setdefault(result.suggested_folder, {})[len(files)] = result
+        files.append(result)
+    return {'folders': folders, 'files': files, 'ordinals': ordinals}
+
+
+def columnar_plan(results) -> OrganizationPlan:
+    plan = OrganizationPlan(known_folders=set(FOLDERS))
+    for result in results:
+        plan.add_result(result)
+    return plan
+
+
+# bytes still allocated once build(results) returns
+def measure(build, results) -> int:
+    tracemalloc.start()
+    kept = build(results)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"{count:,} files in {len(FOLDERS)} folders")
+    for label, unique in (("rule/mock reasonings", False), ("unique AI reasonings", True)):
+        objects = measure(object_plan, synthetic_results(count, unique))
+        columns = measure(columnar_plan, synthetic_results(count, unique))
+        print(f"  {label}")
+        print(f"    ClassificationResult objects {objects / count:7.0f} bytes/file")
+        print(f"    columnar OrganizationPlan    {columns / count:7.0f} bytes/file  ({objects / columns:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
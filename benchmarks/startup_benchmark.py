@@ -0,0 +1,62 @@
+# startup cost of getting Drive services: googleapiclient's build() against the
+# cached discovery document used by auth.build_drive_service, and the lazy service
+# the organizer starts with. no network calls or real credentials needed.
+#
+#   python benchmarks/startup_benchmark.py [services per run]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'drive_organizer'))
+
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+import auth
+
+
+# best of `repeat` timings of fn(), in milliseconds
+def best_ms(fn, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    # one run builds a service per worker thread plus the main and prefetch ones
+    services = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    creds = Credentials(token='benchmark')
+
+    def with_build():
+        for _ in range(services):
+            build('drive', 'v3', credentials=creds)
+
+    def with_cached_document():
+        for _ in range(services):
+            auth.build_drive_service(creds)
+
+    def lazy_only():
+        for _ in range(services):
+            auth.LazyDriveService(creds)
+
+    # first call pays for reading and parsing the document once
+    start = time.perf_counter()
+    auth.build_drive_service(creds)
+    first_ms = (time.perf_counter() - start) * 1000
+
+    build_ms = best_ms(with_build)
+    cached_ms = best_ms(with_cached_document)
+    lazy_ms = best_ms(lazy_only)
+
+    print(f"{services} Drive services per run")
+    print(f"  build('drive', 'v3')         {build_ms:8.2f} ms")
+    print(f"  cached discovery document    {cached_ms:8.2f} ms  ({build_ms / cached_ms:.0f}x faster, "
+          f"plus {first_ms:.2f} ms once per process)")
+    print(f"  lazy, never used             {lazy_ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
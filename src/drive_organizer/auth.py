@@ -1,14 +1,30 @@
+import json
 import os
+import threading
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+# the Google auth and API client libraries are imported where they're used, so
+# commands that never authenticate (--help) don't load them
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
 
 SCOPES = ['https://www.googleapis.com/auth/drive']
 
-def get_drive_service(credentials_path: str = 'credentials.json', token_path: str = 'token.json'):
+# where a downloaded discovery document is kept, for client versions without a bundled copy
+DISCOVERY_CACHE_PATH = '.drive_discovery_cache.json'
+DRIVE_DISCOVERY_URL = 'https://www.googleapis.com/discovery/v1/apis/drive/v3/rest'
+
+# parsed Drive discovery document, shared by every service this process builds
+_discovery_document = None
+_discovery_lock = threading.Lock()
+
+# load saved credentials, refreshing them or running the OAuth flow if needed
+def get_credentials(credentials_path: str = 'credentials.json', token_path: str = 'token.json') -> "Credentials":
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
     creds = None
     # convert to path obj for easier handling
     credentials_file = Path(credentials_path)
@@ -45,13 +61,96 @@ def get_drive_service(credentials_path: str = 'credentials.json', token_path: st
             with open(token_file, 'w') as token:
                 token.write(creds.to_json())
 
+    return creds
+
+
+# the Drive v3 discovery document, parsed once per process. it comes from the copy
+# bundled with google-api-python-client; without one it is downloaded once and kept
+# on disk, and re-downloaded when the installed client version changes
+def drive_discovery_document(cache_path: str = DISCOVERY_CACHE_PATH) -> dict:
+    global _discovery_document
+    with _discovery_lock:
+        if _discovery_document is None:
+            _discovery_document = _load_discovery_document(Path(cache_path))
+        return _discovery_document
+
+
+def _load_discovery_document(cache_file: Path) -> dict:
+    from googleapiclient import discovery_cache
+    from googleapiclient.version import __version__ as client_version
+
+    bundled = discovery_cache.get_static_doc('drive', 'v3')
+    if bundled is not None:
+        return json.loads(bundled)
+
+    if cache_file.exists():
+        try:
+            cached = json.loads(cache_file.read_text())
+            if cached.get('client_version') == client_version:
+                return cached['document']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    import httplib2
+    _, content = httplib2.Http().request(DRIVE_DISCOVERY_URL)
+    document = json.loads(content)
+    try:
+        cache_file.write_text(json.dumps({'client_version': client_version, 'document': document}))
+    except OSError:
+        pass
+    return document
+
+
+# build a Drive API client for already authorized credentials
+def build_drive_service(creds: "Credentials"):
+    from googleapiclient.discovery import build_from_document
+    # build() would read and parse the discovery document again for every service
+    return build_from_document(drive_discovery_document(), credentials=creds)
+
+
+# stands in for a Drive service and builds the real one on first use, so a run that
+# never gets as far as talking to Drive doesn't pay for it
+class LazyDriveService:
+    def __init__(self, creds: "Credentials"):
+        self._creds = creds
+        self._service = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        with self._lock:
+            if self._service is None:
+                self._service = build_drive_service(self._creds)
+        return getattr(self._service, name)
+
+
+def get_drive_service(credentials_path: str = 'credentials.json', token_path: str = 'token.json'):
+    creds = get_credentials(credentials_path, token_path)
+
     # build and return API service
     print("Building Google Drive service...")
-    service = build('drive', 'v3', credentials=creds)
+    service = build_drive_service(creds)
     print("Successfully authenticated with Google Drive!\n")
     return service
 
 
+# hands every thread its own Drive service built from shared credentials.
+# a service object wraps an httplib2 connection, which is not thread-safe
+class ThreadLocalDriveServices:
+    def __init__(self, creds: "Credentials"):
+        self._creds = creds
+        self._local = threading.local()
+
+    # this thread's service, built on first use
+    def get(self):
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = build_drive_service(self._creds)
+            self._local.service = service
+        return service
+
+    __call__ = get
+
+
 if __name__ == "__main__":
     # quick test of the authentication
     print("=" * 50)
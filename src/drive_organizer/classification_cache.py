@@ -0,0 +1,148 @@
+import hashlib
+import json
+import sqlite3
+import time
+from dataclasses import asdict
+from typing import Iterable, Optional
+
+from mock_classifier import ClassificationResult
+
+DEFAULT_CACHE_PATH = '.drive_organizer_cache.sqlite'
+
+
+# short order- and case-independent hash of a set of folder names
+def folder_set_hash(folders: Iterable[str]) -> str:
+    names = sorted({folder.casefold() for folder in folders})
+    return hashlib.sha256("\n".join(names).encode('utf-8')).hexdigest()[:16]
+
+
+# what the on-disk caches share: a connection (which several caches can share, as
+# two SQLite connections to one file lock each other out while one has writes
+# pending), hit/miss counters, and commits grouped every COMMIT_EVERY writes
+class CacheStore:
+    COMMIT_EVERY = 100
+
+    def __init__(self, path: str, conn: Optional[sqlite3.Connection] = None):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._pending_writes = 0
+        # a borrowed connection is left open for its owner to close
+        self._owns_conn = conn is None
+        self.conn = conn if conn is not None else sqlite3.connect(path)
+
+    # commit in groups instead of once per file
+    def _note_write(self) -> None:
+        self._pending_writes += 1
+        if self._pending_writes >= self.COMMIT_EVERY:
+            self.flush()
+
+    def flush(self) -> None:
+        self.conn.commit()
+        self._pending_writes = 0
+
+    def close(self) -> None:
+        self.flush()
+        if self._owns_conn:
+            self.conn.close()
+
+    # size figures added to stats()
+    def _size_stats(self) -> dict:
+        return {}
+
+    # hit/miss counters for the current run
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            **self._size_stats()
+        }
+
+
+# persistent ClassificationResult cache so unchanged files are not classified again.
+# one row per (file, classifier mode); a row only counts as a hit when the file's
+# modifiedTime, the folder set and the prompt/rule-set version all still match
+class ClassificationCache(CacheStore):
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = 50_000):
+        super().__init__(path)
+        self.max_entries = max_entries
+
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS classifications (
+                file_id TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                modified_time TEXT,
+                folders_hash TEXT NOT NULL,
+                version TEXT NOT NULL,
+                result TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (file_id, mode)
+            )
+        ''')
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_classifications_last_used ON classifications (last_used)'
+        )
+        self.conn.commit()
+        self._size = self.conn.execute('SELECT COUNT(*) FROM classifications').fetchone()[0]
+
+    # cached result for this exact file version and classifier setup, or None
+    def get(self, file_id: str, modified_time: Optional[str], folders_hash: str,
+            version: str, mode: str) -> Optional[ClassificationResult]:
+        row = self.conn.execute(
+            'SELECT modified_time, folders_hash, version, result FROM classifications '
+            'WHERE file_id = ? AND mode = ?',
+            (file_id, mode)
+        ).fetchone()
+
+        # files without a modifiedTime can't be validated, so never serve them from cache
+        if (row is None or modified_time is None
+                or tuple(row[:3]) != (modified_time, folders_hash, version)):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.conn.execute(
+            'UPDATE classifications SET last_used = ? WHERE file_id = ? AND mode = ?',
+            (time.time(), file_id, mode)
+        )
+        self._note_write()
+        return ClassificationResult(**json.loads(row[3]))
+
+    # store a result, replacing any older entry for the same file and mode
+    def put(self, result: ClassificationResult, modified_time: Optional[str],
+            folders_hash: str, version: str, mode: str) -> None:
+        if modified_time is None:
+            return
+
+        cursor = self.conn.execute(
+            'INSERT OR REPLACE INTO classifications '
+            '(file_id, mode, modified_time, folders_hash, version, result, last_used) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (result.file_id, mode, modified_time, folders_hash, version,
+             json.dumps(asdict(result)), time.time())
+        )
+        # INSERT OR REPLACE reports one changed row either way, so re-count lazily on eviction
+        self._size += cursor.rowcount
+        if self._size > self.max_entries:
+            self._evict()
+        self._note_write()
+
+    # drop least recently used entries until we're back under max_entries
+    def _evict(self) -> None:
+        self._size = self.conn.execute('SELECT COUNT(*) FROM classifications').fetchone()[0]
+        excess = self._size - self.max_entries
+        if excess <= 0:
+            return
+        # evict a little extra so we don't run this on every insert
+        excess += self.max_entries // 10
+        self.conn.execute(
+            'DELETE FROM classifications WHERE rowid IN '
+            '(SELECT rowid FROM classifications ORDER BY last_used LIMIT ?)',
+            (excess,)
+        )
+        self._size = max(0, self._size - excess)
+
+    def _size_stats(self) -> dict:
+        return {'entries': self._size}
@@ -1,23 +1,202 @@
 import os
 import json
+from itertools import islice
 from dataclasses import dataclass
-from typing import Optional
-from dotenv import load_dotenv
-import google.generativeai as genai
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional, Union
 
 # import from our separate mock classifier module
-from mock_classifier import MockClassifier, ClassificationResult
+from mock_classifier import MockClassifier, ClassificationResult, CONFIDENCE_LABELS
+from folder_registry import FolderRegistry
+from classification_cache import ClassificationCache, folder_set_hash
+from snippet_cache import SnippetCache
+from folder_consolidation import DEFAULT_SIMILARITY_THRESHOLD, consolidate_new_folders
+from content_prefetch import DEFAULT_PREFETCH_WORKERS, prefetch
+
+# asyncio (and the rate limiter built on it) is only imported by the concurrent
+# path, it's a noticeable share of startup otherwise
+if TYPE_CHECKING:
+    from rate_limiter import RateLimiter
+
+MODEL_NAME = "gemini-2.0-flash"
+
+# batched prompts are packed up to roughly this many tokens
+MAX_BATCH_PROMPT_TOKENS = 8000
+
+# how the model should answer for a single file
+SINGLE_RESPONSE_FORMAT = '''RESPOND WITH ONLY A JSON OBJECT in this exact format:
+{
+    "suggested_folder": "Specific Folder Name Here",
+    "is_new_folder": true or false,
+    "confidence": "high" or "medium" or "low",
+    "reasoning": "Brief explanation of why this folder fits"
+}
+
+IMPORTANT: 
+- Return ONLY the JSON object, no other text
+- "is_new_folder" should be true only if the folder doesn't exist in the list above
+- Be decisive - pick the BEST option, don't hedge'''
+
+# how the model should answer for a batch of files
+BATCH_RESPONSE_FORMAT = '''You will be given SEVERAL files. RESPOND WITH ONLY A JSON ARRAY containing one object per file, in this exact format:
+[
+    {
+        "file_id": "The file_id given for the file",
+        "suggested_folder": "Specific Folder Name Here",
+        "is_new_folder": true or false,
+        "confidence": "high" or "medium" or "low",
+        "reasoning": "Brief explanation of why this folder fits"
+    }
+]
+
+IMPORTANT: 
+- Return ONLY the JSON array, no other text
+- Include exactly one object for EVERY file, with its file_id copied exactly
+- Classify each file on its own; files in one batch don't have to share a folder
+- "is_new_folder" should be true only if the folder doesn't exist in the list above
+- Be decisive - pick the BEST option, don't hedge'''
+
+
+# rate limits are charged for the prompt plus roughly this many answer tokens
+RESPONSE_TOKEN_ALLOWANCE = 150
+
+
+# rule-engine answers that always go on to the model in cascade mode
+CASCADE_FALLBACK_FOLDERS = ("To Sort", "Drafts")
+
+
+# rough token count for prompt budgeting (~4 characters per token)
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+# bookkeeping shared by the sync and async classify_multiple paths: keeps results
+# in input order, tracks the growing folder set and reads/writes the cache.
+# total is None when files are streamed in and the count isn't known yet
+class _ClassificationRun:
+    def __init__(self, total: Optional[int], existing_folders: list[str], cache: Optional[ClassificationCache],
+                 cache_version: str, cache_mode: str, progress_callback=None,
+                 snippet_cache: Optional[SnippetCache] = None):
+        self.total = total
+        self.results = [None] * (total or 0)
+        self.done = 0
+        self.existing_folders = FolderRegistry(existing_folders)
+        self.all_folders = FolderRegistry(existing_folders) # copy to avoid modifying original
+        self.progress_callback = progress_callback
+
+        # cache key parts that are the same for every file in this run
+        self.cache = cache
+        self.folders_hash = folder_set_hash(existing_folders) if cache is not None else None
+        self.cache_version = cache_version
+        self.cache_mode = cache_mode
+        self.snippet_cache = snippet_cache
+        # bytes downloaded for content that hasn't been reported yet, by file id
+        self.content_bytes: dict[str, int] = {}
+
+    # reuse the previous run's answer if this file hasn't changed
+    def cached_result(self, file: dict) -> Optional[ClassificationResult]:
+        if self.cache is None:
+            return None
+        result = self.cache.get(file.get('id', ''), file.get('modifiedTime'), self.folders_hash,
+                                self.cache_version, self.cache_mode)
+        if result is not None:
+            result.file_name = file.get('name', 'Untitled')
+        return result
+
+    # content read on an earlier run, if the file hasn't changed since
+    def cached_snippet(self, file: dict) -> Optional[str]:
+        if self.snippet_cache is None:
+            return None
+        return self.snippet_cache.get(file)
+
+    def store_snippet(self, file: dict, content_snippet: Optional[str]) -> None:
+        # '' means the file was read and has no text, which is worth remembering too;
+        # None means the read failed and should be tried again next run
+        if self.snippet_cache is not None and content_snippet is not None:
+            self.snippet_cache.put(file, content_snippet)
+
+    # bytes downloaded for this file's content, forgotten once asked for
+    def take_content_bytes(self, file: dict) -> int:
+        return self.content_bytes.pop(file.get('id', ''), 0)
+
+    # record a finished result in its input slot
+    def finish(self, i: int, file: dict, result: ClassificationResult, cached: bool = False) -> None:
+        # keep what the listing told us about the file for execute_plan
+        result.parents = file.get('parents')
+        result.modified_time = file.get('modifiedTime')
+
+        # if suggests new folder, add it to our list - or reuse the spelling
+        # another file already introduced
+        if result.is_new_folder:
+            introduced = self.all_folders.resolve(result.suggested_folder)
+            if introduced is None:
+                self.all_folders.add(result.suggested_folder)
+            else:
+                result.suggested_folder = introduced
+
+        # failed API calls are retried next run rather than cached
+        if self.cache is not None and not cached and not result.reasoning.startswith("Classification failed"):
+            self.cache.put(result, file.get('modifiedTime'), self.folders_hash, self.cache_version, self.cache_mode)
+
+        if i >= len(self.results):
+            self.results.extend([None] * (i + 1 - len(self.results)))
+        self.results[i] = result
+        self.done += 1
+        # call progress callback if provided
+        if self.progress_callback:
+            self.progress_callback(self.done, self.total, result)
+
+        cached_label = ", cached" if cached else ""
+        print(f"       → {result.file_name[:30]}: {result.suggested_folder} ({result.confidence} confidence{cached_label})")
+
+    # "[3/10]" style progress prefix, "[3]" while the total is unknown
+    def label(self, i: int) -> str:
+        return f"[{i+1}/{self.total}]" if self.total is not None else f"[{i+1}]"
+
+    # merge near-duplicate new folders once every file has an answer
+    def consolidate(self, threshold: float) -> None:
+        renames = consolidate_new_folders(self.results, self.existing_folders, threshold)
+        if renames:
+            print(f"\n  Merged {len(renames)} near-duplicate folder names:")
+            for old, new in sorted(renames.items()):
+                print(f"    {old} → {new}")
+
+        self.all_folders = FolderRegistry(self.existing_folders)
+        for result in self.results:
+            self.all_folders.add(result.suggested_folder)
+
+    def close(self) -> None:
+        if self.cache is not None:
+            self.cache.flush()
+            stats = self.cache.stats()
+            print(f"\n  Cache: {stats['hits']} hits, {stats['misses']} misses")
+        if self.snippet_cache is not None:
+            self.snippet_cache.flush()
+            stats = self.snippet_cache.stats()
+            print(f"  Content cache: {stats['hits']} hits, {stats['misses']} misses")
 
-load_dotenv()
 
 class FileClassifier:
-    # initilize classifier with Gemini
-    def __init__(self, api_key: Optional[str] = None, use_mock: bool = False):
+    # bump whenever _build_system_prompt changes so cached AI results are redone
+    PROMPT_VERSION = "1"
+
+    # initilize classifier with Gemini.
+    # with cascade=True the keyword rules run first and only files they can't place
+    # with at least cascade_min_confidence are sent to Gemini
+    def __init__(self, api_key: Optional[str] = None, use_mock: bool = False, cascade: bool = False, cascade_min_confidence: str = "high"):
         self.use_mock = use_mock
+        self.cascade = cascade and not use_mock
+        self.cascade_min_confidence = cascade_min_confidence
+        # how many files each tier answered, reset per classify_multiple run
+        self.tier_counts = {"rules": 0, "llm": 0}
         
         if use_mock:
             self._mock = MockClassifier()
             return
+
+        if self.cascade:
+            if cascade_min_confidence not in CONFIDENCE_LABELS:
+                raise ValueError(f"cascade_min_confidence must be one of {CONFIDENCE_LABELS}")
+            self._mock = MockClassifier(verbose=False)
         
         # import Gemini only if we're using real API
         try:
@@ -29,6 +208,9 @@ class FileClassifier:
                 "Run: pip install google-generativeai"
             )
         
+        # the key can come from a .env file; only needed (and read) in AI mode
+        from dotenv import load_dotenv
+        load_dotenv()
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
 
         if not self.api_key:
@@ -42,17 +224,29 @@ class FileClassifier:
         # confi gemine client
         genai.configure(api_key=self.api_key)
         # init model
-        self.model = genai.GenerativeModel("gemini-2.0-flash")
+        self.model = genai.GenerativeModel(MODEL_NAME)
         print("✓ AI Classifier initialized with Gemini 2.0 Flash\n")
 
     
+    # identifies what produced a result, for the classification cache
+    def cache_version(self, batch: bool = False) -> str:
+        if self.use_mock:
+            return f"rules-{self._mock.rule_set_version()}"
+        version = f"prompt-{self.PROMPT_VERSION}-batch-{MODEL_NAME}" if batch else f"prompt-{self.PROMPT_VERSION}-{MODEL_NAME}"
+        if self.cascade:
+            version += f"-cascade-{self.cascade_min_confidence}-rules-{self._mock.rule_set_version()}"
+        return version
+
     # build prompt to set up AI context and role
-    def _build_system_prompt(self, existing_folders: list[str]):
+    def _build_system_prompt(self, existing_folders: Union[list[str], FolderRegistry], batch: bool = False):
         # format folder list nicely
         if existing_folders:
             folder_list = "\n".join(f"  - {folder}" for folder in existing_folders)
         else:
             folder_list = "  (No existing folders)"
+        # folders from a tree crawl are listed as paths
+        if any('/' in folder for folder in existing_folders):
+            folder_list += '\n\nFolders inside other folders are written as paths like "School/Biology". Use the full path when you pick one, and you may suggest a new folder inside an existing one the same way.'
 
         return f'''You are a file organization assistant. Your job is to analyze files 
 and decide which folder they belong in.
@@ -97,35 +291,41 @@ BAD FOLDER EXAMPLES (NEVER USE):
 - "Random"
 - "Stuff" 
 
-RESPOND WITH ONLY A JSON OBJECT in this exact format:
-{{
-    "suggested_folder": "Specific Folder Name Here",
-    "is_new_folder": true or false,
-    "confidence": "high" or "medium" or "low",
-    "reasoning": "Brief explanation of why this folder fits"
-}}
-
-IMPORTANT: 
-- Return ONLY the JSON object, no other text
-- "is_new_folder" should be true only if the folder doesn't exist in the list above
-- Be decisive - pick the BEST option, don't hedge'''
+''' + (BATCH_RESPONSE_FORMAT if batch else SINGLE_RESPONSE_FORMAT)
     
     # classify file into folder
-    def classify_file(self, file_name: str, file_id: str, existing_folders: list[str], file_content_snippet: Optional[str] = None) -> ClassificationResult:
+    def classify_file(self, file_name: str, file_id: str, existing_folders: Union[list[str], FolderRegistry], file_content_snippet: Optional[str] = None) -> ClassificationResult:
         # if using mock mode, delegate to mock classifier
         if self.use_mock:
             return self._mock.classify_file(
                 file_name, file_id, existing_folders, file_content_snippet
             )
-        
-        # build user message
-        user_message = f"FILE TO CLASSIFY: {file_name}"
 
-        if file_content_snippet:
-            user_message += f"\n\nFILE CONTENT PREVIEW:\n{file_content_snippet[:500]}"
+        rules_result = self._cascade_rules(file_name, file_id, existing_folders, file_content_snippet)
+        if rules_result is not None:
+            return rules_result
 
-        # build full prompt
-        full_prompt = self._build_system_prompt(existing_folders) + "\n\n" + user_message
+        return self._ask_model(file_name, file_id, existing_folders, file_content_snippet)
+
+    # keyword-rule answer for cascade mode, or None if the file has to go to the model.
+    # counts which tier ends up handling the file
+    def _cascade_rules(self, file_name: str, file_id: str, existing_folders: Union[list[str], FolderRegistry], file_content_snippet: Optional[str] = None) -> Optional[ClassificationResult]:
+        if not self.cascade:
+            return None
+
+        result = self._mock.classify_file(file_name, file_id, existing_folders, file_content_snippet)
+        fallback = result.suggested_folder.casefold() in (f.casefold() for f in CASCADE_FALLBACK_FOLDERS)
+        confident = CONFIDENCE_LABELS.index(result.confidence) >= CONFIDENCE_LABELS.index(self.cascade_min_confidence)
+
+        if fallback or not confident:
+            self.tier_counts["llm"] += 1
+            return None
+        self.tier_counts["rules"] += 1
+        return result
+
+    # classify a single file with Gemini
+    def _ask_model(self, file_name: str, file_id: str, existing_folders: Union[list[str], FolderRegistry], file_content_snippet: Optional[str] = None) -> ClassificationResult:
+        full_prompt = self._build_file_prompt(file_name, existing_folders, file_content_snippet)
 
         try:
             # call gemini api
@@ -135,29 +335,141 @@ IMPORTANT:
             # parse JSON response
             result_dict = self._parse_response(response_text)
             # build and return the ClassificationResult
-            return ClassificationResult(
-                file_id=file_id,
-                file_name=file_name,
-                suggested_folder=result_dict.get('suggested_folder', 'Uncategorized'),
-                is_new_folder=result_dict.get('is_new_folder', True),
-                confidence=result_dict.get('confidence', 'low'),
-                reasoning=result_dict.get('reasoning', 'No reasoning provided')
-            )
+            return self._build_result(file_id, file_name, result_dict, existing_folders)
         except Exception as e:
-            print(f"Error classifying '{file_name}': {e}")
-            return ClassificationResult(
-                file_id=file_id,
-                file_name=file_name,
-                suggested_folder="Uncategorized",
-                is_new_folder=True,
-                confidence="low",
-                reasoning=f"Classification failed: {str(e)}"
-            )
+            return self._failed_result(file_id, file_name, e)
+
+    # async version of classify_file, charged against the rate limiter (if any) before calling the API
+    async def classify_file_async(self, file_name: str, file_id: str, existing_folders: Union[list[str], FolderRegistry], file_content_snippet: Optional[str] = None, rate_limiter: Optional["RateLimiter"] = None) -> ClassificationResult:
+        if self.use_mock:
+            return self.classify_file(file_name, file_id, existing_folders, file_content_snippet)
+
+        rules_result = self._cascade_rules(file_name, file_id, existing_folders, file_content_snippet)
+        if rules_result is not None:
+            return rules_result
+
+        full_prompt = self._build_file_prompt(file_name, existing_folders, file_content_snippet)
+
+        try:
+            if rate_limiter is not None:
+                await rate_limiter.acquire(estimate_tokens(full_prompt) + RESPONSE_TOKEN_ALLOWANCE)
+            response = await self.model.generate_content_async(full_prompt)
+            result_dict = self._parse_response(response.text.strip())
+            return self._build_result(file_id, file_name, result_dict, existing_folders)
+        except Exception as e:
+            return self._failed_result(file_id, file_name, e)
+
+    # full prompt for classifying a single file
+    def _build_file_prompt(self, file_name: str, existing_folders: Union[list[str], FolderRegistry], file_content_snippet: Optional[str] = None) -> str:
+        # build user message
+        user_message = f"FILE TO CLASSIFY: {file_name}"
+
+        if file_content_snippet:
+            user_message += f"\n\nFILE CONTENT PREVIEW:\n{file_content_snippet[:500]}"
+
+        # build full prompt
+        return self._build_system_prompt(existing_folders) + "\n\n" + user_message
+
+    # placeholder result when the API call or parsing fails
+    def _failed_result(self, file_id: str, file_name: str, error: Exception) -> ClassificationResult:
+        print(f"Error classifying '{file_name}': {error}")
+        return ClassificationResult(
+            file_id=file_id,
+            file_name=file_name,
+            suggested_folder="Uncategorized",
+            is_new_folder=True,
+            confidence="low",
+            reasoning=f"Classification failed: {str(error)}"
+        )
         
-    # parse AI response into a dict
-    def _parse_response(self, response_text: str) -> dict:
+    # turn one parsed answer into a ClassificationResult
+    def _build_result(self, file_id: str, file_name: str, result_dict: dict, existing_folders: Union[list[str], FolderRegistry]) -> ClassificationResult:
+        # the model's is_new_folder flag is unreliable, so trust our own folder index
+        suggested_folder = result_dict.get('suggested_folder', 'Uncategorized')
+        existing = FolderRegistry.of(existing_folders).resolve(suggested_folder)
+        return ClassificationResult(
+            file_id=file_id,
+            file_name=file_name,
+            suggested_folder=existing or suggested_folder,
+            is_new_folder=existing is None,
+            confidence=result_dict.get('confidence', 'low'),
+            reasoning=result_dict.get('reasoning', 'No reasoning provided')
+        )
+
+    # classify several files with Gemini in one request
+    def _ask_model_batch(self, items: list[tuple[str, str, Optional[str]]], folders: FolderRegistry) -> list[ClassificationResult]:
+        if not items:
+            return []
+        if len(items) == 1:
+            file_id, file_name, snippet = items[0]
+            return [self._ask_model(file_name, file_id, folders, snippet)]
+
+        full_prompt = self._build_system_prompt(folders, batch=True) + "\n\n" + self._build_batch_message(items)
+
+        try:
+            response = self.model.generate_content(full_prompt)
+            answers = self._parse_batch_response(response.text)
+        except Exception as e:
+            print(f"Error classifying batch of {len(items)} files: {e}")
+            answers = {}
+
+        missing = sum(1 for file_id, _, _ in items if file_id not in answers)
+        if missing:
+            print(f"      ({missing} of {len(items)} files missing from batch answer, retrying individually)")
+
+        results = []
+        for file_id, file_name, snippet in items:
+            result_dict = answers.get(file_id)
+            if result_dict is None:
+                results.append(self._ask_model(file_name, file_id, folders, snippet))
+            else:
+                results.append(self._build_result(file_id, file_name, result_dict, folders))
+        return results
+
+    # list the files of one batch for the model
+    def _build_batch_message(self, items: list[tuple[str, str, Optional[str]]]) -> str:
+        return "FILES TO CLASSIFY:\n" + json.dumps(
+            [self._batch_entry(file_id, file_name, snippet) for file_id, file_name, snippet in items],
+            ensure_ascii=False,
+            indent=1
+        )
+
+    def _batch_entry(self, file_id: str, file_name: str, snippet: Optional[str]) -> dict:
+        entry = {"file_id": file_id, "name": file_name}
+        if snippet:
+            entry["content_preview"] = snippet[:500]
+        return entry
+
+    # parse a batch answer into {file_id: answer dict}. when the array as a whole
+    # isn't valid JSON, salvage whichever individual objects still parse
+    def _parse_batch_response(self, response_text: str) -> dict[str, dict]:
+        text = self._strip_code_fence(response_text)
+
+        try:
+            entries = json.loads(text)
+        except json.JSONDecodeError:
+            import re
+            entries = []
+            for json_match in re.finditer(r'\{[^{}]*\}', text, re.DOTALL):
+                try:
+                    entries.append(json.loads(json_match.group()))
+                except json.JSONDecodeError:
+                    continue
+
+        if isinstance(entries, dict):
+            entries = [entries]
+        if not isinstance(entries, list):
+            raise ValueError(f"Expected a JSON array from AI: {text[:100]}...")
+
+        answers = {}
+        for entry in entries:
+            if isinstance(entry, dict) and 'file_id' in entry:
+                answers[str(entry['file_id'])] = entry
+        return answers
+
+    # remove markdown code blocks if present
+    def _strip_code_fence(self, response_text: str) -> str:
         text = response_text.strip()
-        # remove markdown code blocks if present
         if text.startswith("```"):
             # find the end of the opening ``` line
             first_newline = text.find('\n')
@@ -165,6 +477,11 @@ IMPORTANT:
             last_backticks = text.rfind('```')
             if last_backticks > first_newline:
                 text = text[first_newline:last_backticks].strip()
+        return text
+
+    # parse AI response into a dict
+    def _parse_response(self, response_text: str) -> dict:
+        text = self._strip_code_fence(response_text)
 
         # parse JSON
         try:
@@ -179,55 +496,238 @@ IMPORTANT:
                 raise ValueError(f"Could not parse AI response as JSON: {text[:100]}...")
             
         
-    # classify multiple files
-    def classify_multiple(self, files: list[str], existing_folders: list[str], extract_content: bool = False, progress_callback = None, service = None) -> list[ClassificationResult]:
-        results = []
-        total = len(files)
+    # classify multiple files. with batch_size > 1 (AI mode) files are sent to the
+    # model in groups of up to batch_size, packed to stay under max_prompt_tokens.
+    # with concurrency > 1 the async path below is used instead.
+    # with consolidate=True every file is classified against the original folders
+    # only, and near-duplicate new folder names are merged at the end.
+    # files can be any iterable, e.g. a listing that is still streaming in
+    def classify_multiple(self, files: Iterable[dict], existing_folders: list[str], extract_content: bool = False, progress_callback = None, service = None, cache: Optional[ClassificationCache] = None, batch_size: int = 1, max_prompt_tokens: int = MAX_BATCH_PROMPT_TOKENS, concurrency: int = 1, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None, consolidate: bool = False, similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD, service_factory: Optional[Callable] = None, prefetch_workers: int = DEFAULT_PREFETCH_WORKERS, snippet_cache: Optional[SnippetCache] = None) -> list[ClassificationResult]:
+        if concurrency > 1 and not self.use_mock:
+            import asyncio
+            return asyncio.run(self.classify_multiple_async(
+                files, existing_folders,
+                concurrency=concurrency,
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute,
+                extract_content=extract_content,
+                progress_callback=progress_callback,
+                service=service,
+                cache=cache,
+                consolidate=consolidate,
+                similarity_threshold=similarity_threshold,
+                service_factory=service_factory,
+                prefetch_workers=prefetch_workers,
+                snippet_cache=snippet_cache
+            ))
 
+        total = len(files) if hasattr(files, '__len__') else None
+        batching = batch_size > 1 and not self.use_mock
         mode_label = "mock mode" if self.use_mock else "AI mode"
         content_label = " + content reading" if (extract_content) else ""
-        print(f"Classifying {total} files ({mode_label})...\n")
+        batch_label = f", up to {batch_size} files per request" if batching else ""
+        count_label = f"{total} files" if total is not None else "files as they are listed"
+        print(f"Classifying {count_label} ({mode_label}{batch_label})...\n")
 
-        all_folders = list(existing_folders) # copy to avoid modifying original
+        run = self._start_run(total, existing_folders, cache, extract_content, progress_callback, batch=batching, snippet_cache=snippet_cache)
+        # folders each request gets to see: the growing set, or a fixed one when consolidating
+        visible_folders = run.existing_folders if consolidate else run.all_folders
 
-        for i, file in enumerate(files):
+        # files waiting for the next batched request, and its estimated size
+        pending = []
+        pending_tokens = 0
+        prompt_tokens = 0
+
+        def send_pending() -> None:
+            nonlocal pending, pending_tokens
+            items = [(file.get('id', ''), file.get('name', 'Untitled'), snippet) for _, file, snippet in pending]
+            for (i, file, _), result in zip(pending, self._ask_model_batch(items, visible_folders)):
+                run.finish(i, file, result)
+            pending = []
+            pending_tokens = 0
+
+        entries = self._entries(run, files, extract_content, service, service_factory, prefetch_workers)
+        for i, (file, cached, content_snippet) in enumerate(entries):
             file_name = file.get('name', 'Untitled')
             file_id = file.get('id', '')
 
-            print(f"  [{i+1}/{total}] {file_name[:50]}...")
-            
-            # extract content if requested and service is available
-            content_snippet = None
-            if extract_content and service:
-                try:
-                    # import here to avoid circular imports
-                    from drive_client import get_file_content_snippet
-                    content_snippet = get_file_content_snippet(service, file)
-                    if content_snippet:
-                        print(f"      (read {len(content_snippet)} chars of content)")
-                except Exception as e:
-                    pass  
+            print(f"  {run.label(i)} {file_name[:50]}...")
+
+            if cached is not None:
+                run.finish(i, file, cached, cached=True)
+                continue
+
+            self._report_snippet(run, content_snippet, file)
+
+            if batching:
+                # files the keyword rules can place never take up room in a batch
+                rules_result = self._cascade_rules(file_name, file_id, visible_folders, content_snippet)
+                if rules_result is not None:
+                    run.finish(i, file, rules_result)
+                    continue
+
+                # send what we have before this file would overflow the batch
+                item_tokens = estimate_tokens(json.dumps(self._batch_entry(file_id, file_name, content_snippet), ensure_ascii=False))
+                if pending and (len(pending) >= batch_size or prompt_tokens + pending_tokens + item_tokens > max_prompt_tokens):
+                    send_pending()
+                # the folder list grows during the run, so re-measure the prompt per batch
+                if not pending:
+                    prompt_tokens = estimate_tokens(self._build_system_prompt(visible_folders, batch=True))
+                pending.append((i, file, content_snippet))
+                pending_tokens += item_tokens
+                continue
 
             result = self.classify_file(
                 file_name=file_name,
                 file_id=file_id,
-                existing_folders=all_folders,
+                existing_folders=visible_folders,
                 file_content_snippet=content_snippet
             )
+            run.finish(i, file, result)
 
-            # if suggests new folder, add it to our list
-            if result.is_new_folder and result.suggested_folder not in all_folders:
-                all_folders.append(result.suggested_folder)
-            
-            results.append(result)
-            # call progress callback if provided
-            if progress_callback:
-                progress_callback(i + 1, total, result)
-            
-            print(f"       → {result.suggested_folder} ({result.confidence} confidence)")
+        if pending:
+            send_pending()
 
+        if consolidate:
+            run.consolidate(similarity_threshold)
+        run.close()
+        self._report_tiers()
         print(f"\n✓ Classification complete!")
-        return results
+        return run.results
+
+    # classify files with up to `concurrency` API calls in flight, optionally rate limited.
+    # files go out in waves of `concurrency`: every file in a wave sees the same folder
+    # snapshot, and the new folders a wave suggests are merged (in input order) before
+    # the next wave starts. with consolidate=True there are no waves: every file sees
+    # the original folders and near-duplicate new folders are merged afterwards.
+    # results come back in input order
+    async def classify_multiple_async(self, files: Iterable[dict], existing_folders: list[str], concurrency: int = 8, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None, extract_content: bool = False, progress_callback = None, service = None, cache: Optional[ClassificationCache] = None, consolidate: bool = False, similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD, service_factory: Optional[Callable] = None, prefetch_workers: int = DEFAULT_PREFETCH_WORKERS, snippet_cache: Optional[SnippetCache] = None) -> list[ClassificationResult]:
+        import asyncio
+
+        if consolidate:
+            # one wave over everything, so we need the whole list up front
+            files = list(files)
+        total = len(files) if hasattr(files, '__len__') else None
+        concurrency = max(1, concurrency)
+        mode_label = "mock mode" if self.use_mock else "AI mode"
+        count_label = f"{total} files" if total is not None else "files as they are listed"
+        print(f"Classifying {count_label} ({mode_label}, {concurrency} concurrent requests)...\n")
+
+        run = self._start_run(total, existing_folders, cache, extract_content, progress_callback, snippet_cache=snippet_cache)
+        rate_limiter = None
+        if requests_per_minute or tokens_per_minute:
+            from rate_limiter import RateLimiter
+            rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+
+        # a single wave when consolidating, the semaphore then bounds the calls in flight
+        wave_size = max(1, total) if consolidate else concurrency
+        in_flight = asyncio.Semaphore(concurrency)
+
+        async def bounded(call):
+            async with in_flight:
+                return await call
+
+        remaining = self._entries(run, files, extract_content, service, service_factory, prefetch_workers)
+        start = 0
+        while True:
+            wave_files = list(islice(remaining, wave_size))
+            if not wave_files:
+                break
+            wave = range(start, start + len(wave_files))
+            start += len(wave_files)
+            snapshot = run.existing_folders if consolidate else FolderRegistry(run.all_folders)
+            cached = {}
+            calls = {}
+
+            # content comes with the entries, the Drive service can't be shared across calls in flight
+            for i, (file, result, content_snippet) in zip(wave, wave_files):
+                print(f"  {run.label(i)} {file.get('name', 'Untitled')[:50]}...")
+                if result is not None:
+                    cached[i] = result
+                    continue
+                self._report_snippet(run, content_snippet, file)
+                calls[i] = bounded(self.classify_file_async(
+                    file.get('name', 'Untitled'), file.get('id', ''), snapshot, content_snippet, rate_limiter
+                ))
+
+            answers = dict(zip(calls, await asyncio.gather(*calls.values())))
+
+            for i, (file, _, _) in zip(wave, wave_files):
+                if i in cached:
+                    run.finish(i, file, cached[i], cached=True)
+                else:
+                    run.finish(i, file, answers[i])
+
+        if consolidate:
+            run.consolidate(similarity_threshold)
+        run.close()
+        self._report_tiers()
+        print(f"\n✓ Classification complete!")
+        return run.results
+
+    def _start_run(self, total: Optional[int], existing_folders: list[str], cache: Optional[ClassificationCache], extract_content: bool, progress_callback=None, batch: bool = False, snippet_cache: Optional[SnippetCache] = None) -> _ClassificationRun:
+        self.tier_counts = {"rules": 0, "llm": 0}
+        cache_mode = ("mock" if self.use_mock else "ai") + ("+content" if extract_content else "")
+        return _ClassificationRun(total, existing_folders, cache, self.cache_version(batch=batch), cache_mode, progress_callback, snippet_cache)
+
+    # how many files the keyword rules handled vs. Gemini, in cascade mode
+    def _report_tiers(self) -> None:
+        if not self.cascade:
+            return
+        print(f"\n  Cascade: {self.tier_counts['rules']} files placed by keyword rules, "
+              f"{self.tier_counts['llm']} sent to Gemini")
+
+    # (file, cached result, content snippet) for each file. content is only read for
+    # files that aren't cached, from the snippet cache when it has them; with a
+    # service_factory the rest is fetched by a pool of threads, each with its own
+    # Drive service, while earlier files are classified
+    def _entries(self, run: _ClassificationRun, files: Iterable[dict], extract_content: bool, service,
+                 service_factory: Optional[Callable], prefetch_workers: int) -> Iterator[tuple]:
+        if not extract_content:
+            for file in files:
+                yield file, run.cached_result(file), None
+            return
+
+        # cache lookups stay on this thread, only the fetching is handed out
+        def looked_up() -> Iterator[tuple]:
+            for file in files:
+                cached = run.cached_result(file)
+                yield file, cached, (run.cached_snippet(file) if cached is None else None)
+
+        # (snippet, bytes downloaded) for one entry
+        def fetch(entry: tuple, get_service: Callable) -> tuple[Optional[str], int]:
+            file, cached, stored = entry
+            if cached is not None or stored is not None:
+                return stored, 0
+            return self._content_snippet(file, get_service())
+
+        if service_factory is None:
+            fetched = ((entry, fetch(entry, lambda: service)) for entry in looked_up())
+        else:
+            fetched = prefetch(looked_up(), lambda entry: fetch(entry, service_factory), workers=prefetch_workers)
+
+        for (file, cached, stored), (content_snippet, downloaded) in fetched:
+            if cached is None and stored is None:
+                run.store_snippet(file, content_snippet)
+                if content_snippet:
+                    run.content_bytes[file.get('id', '')] = downloaded
+            yield file, cached, content_snippet
+
+    # extract content if requested and service is available. returns (snippet, bytes downloaded)
+    def _content_snippet(self, file: dict, service) -> tuple[Optional[str], int]:
+        if not service:
+            return None, 0
+        try:
+            # import here to avoid circular imports
+            from drive_client import read_content_snippet
+            return read_content_snippet(service, file)
+        except Exception as e:
+            return None, 0
+
+    def _report_snippet(self, run: _ClassificationRun, content_snippet: Optional[str], file: dict) -> None:
+        if content_snippet:
+            downloaded = run.take_content_bytes(file)
+            print(f"      (read {len(content_snippet)} chars of content, {downloaded / 1024:.0f} KB downloaded)")
     
 
 if __name__ == "__main__":
@@ -0,0 +1,166 @@
+import codecs
+import html
+import re
+import struct
+import zlib
+from typing import Callable, Optional
+
+# how much of an uploaded file we read at most per Range request. plain text needs
+# very little; a PDF's first text usually sits behind a font or two
+TEXT_RANGE_BYTES = 4 * 1024
+PDF_RANGE_BYTES = 64 * 1024
+DOCX_RANGE_BYTES = 64 * 1024
+
+# a .docx entry can sit past the first range; never read more than this many ranges
+MAX_RANGE_REQUESTS = 3
+
+TEXT_MIME_TYPES = {'text/plain', 'text/markdown', 'text/x-markdown', 'text/csv', 'text/tab-separated-values'}
+TEXT_EXTENSIONS = ('.txt', '.md', '.markdown', '.csv', '.tsv')
+MIME_TYPE_PDF = 'application/pdf'
+MIME_TYPE_DOCX = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+
+# reads byte ranges of one uploaded file with `alt=media` Range requests, counting
+# what was downloaded
+class RangeReader:
+    def __init__(self, service, file_id: str):
+        self.service = service
+        self.file_id = file_id
+        self.requests = 0
+        self.downloaded = 0
+
+    def read(self, start: int, length: int) -> bytes:
+        request = self.service.files().get_media(fileId=self.file_id)
+        request.headers['Range'] = f'bytes={start}-{start + length - 1}'
+        self.requests += 1
+        data = request.execute()
+        # a server that ignores Range sends everything; don't hand back more than asked for
+        self.downloaded += len(data)
+        return data[:length]
+
+
+# decode as much complete UTF-8 as there is; a character cut off by the range end is dropped
+def _decode_prefix(data: bytes) -> str:
+    return codecs.getincrementaldecoder('utf-8-sig')(errors='ignore').decode(data, final=False)
+
+
+def extract_text(reader: RangeReader, max_chars: int) -> Optional[str]:
+    # roughly 4 bytes per character covers any UTF-8
+    text = _decode_prefix(reader.read(0, min(TEXT_RANGE_BYTES, max_chars * 4)))
+    return text[:max_chars] or None
+
+
+PDF_STREAM_RE = re.compile(rb'stream\r?\n(.*?)(?:endstream|\Z)', re.S)
+PDF_TEXT_BLOCK_RE = re.compile(rb'BT(.*?)ET', re.S)
+PDF_STRING_RE = re.compile(rb'\(((?:\\.|[^\\)])*)\)\s*(?:Tj|\'|")|\[((?:[^\]\\]|\\.)*)\]\s*TJ', re.S)
+PDF_ARRAY_STRING_RE = re.compile(rb'\(((?:\\.|[^\\)])*)\)', re.S)
+PDF_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f'}
+
+
+# unescape a PDF literal string: \n, \(, \\, octal codes and so on
+def _pdf_unescape(raw: bytes) -> bytes:
+    def replace(match):
+        escaped = match.group(1)
+        if escaped[:1].isdigit():
+            return bytes([int(escaped, 8) & 0xFF])
+        return PDF_ESCAPES.get(escaped, escaped)
+    return re.sub(rb'\\([0-7]{1,3}|.)', replace, raw, flags=re.S)
+
+
+# text shown by the Tj/TJ operators of one content stream
+def _pdf_stream_text(content: bytes) -> str:
+    pieces = []
+    for block in PDF_TEXT_BLOCK_RE.findall(content):
+        for single, array in PDF_STRING_RE.findall(block):
+            if array:
+                pieces.append(b"".join(_pdf_unescape(s) for s in PDF_ARRAY_STRING_RE.findall(array)))
+            else:
+                pieces.append(_pdf_unescape(single))
+        pieces.append(b"\n")
+    return b" ".join(pieces).decode('latin-1')
+
+
+# text from the first content stream in the start of a PDF that has readable text.
+# only literal strings are understood; fonts with custom encodings give up
+def extract_pdf(reader: RangeReader, max_chars: int) -> Optional[str]:
+    data = reader.read(0, PDF_RANGE_BYTES)
+    if not data.startswith(b'%PDF'):
+        return None
+
+    for raw in PDF_STREAM_RE.findall(data):
+        try:
+            # most streams are FlateDecode; a truncated one still inflates up to the cut
+            content = zlib.decompressobj().decompress(raw)
+        except zlib.error:
+            content = raw
+        if b'BT' not in content:
+            continue
+        text = re.sub(r'\s+', ' ', _pdf_stream_text(content)).strip()
+        if sum(c.isalpha() for c in text) >= 3:
+            return text[:max_chars]
+    return None
+
+
+ZIP_LOCAL_HEADER = struct.Struct('<4sHHHHHIIIHH')
+ZIP_LOCAL_SIGNATURE = b'PK\x03\x04'
+DOCX_BODY = 'word/document.xml'
+DOCX_PARAGRAPH_RE = re.compile(r'</w:p>')
+DOCX_TEXT_RE = re.compile(r'<w:t(?:\s[^>]*)?>([^<]*)</w:t>')
+
+
+# text from the start of word/document.xml. walks the zip's local file headers from
+# the front, reading further ranges only when the entry starts past what we have
+def extract_docx(reader: RangeReader, max_chars: int) -> Optional[str]:
+    buffer_start = 0
+    buffer = reader.read(0, DOCX_RANGE_BYTES)
+    offset = 0
+
+    def ensure(start: int, length: int) -> bytes:
+        nonlocal buffer_start, buffer
+        if start < buffer_start or start + length > buffer_start + len(buffer):
+            if reader.requests >= MAX_RANGE_REQUESTS:
+                return b""
+            buffer_start, buffer = start, reader.read(start, max(length, DOCX_RANGE_BYTES))
+        return buffer[start - buffer_start:start - buffer_start + length]
+
+    while True:
+        header = ensure(offset, ZIP_LOCAL_HEADER.size)
+        if len(header) < ZIP_LOCAL_HEADER.size:
+            return None
+        signature, _, flags, method, _, _, _, compressed_size, _, name_length, extra_length = \
+            ZIP_LOCAL_HEADER.unpack(header)
+        if signature != ZIP_LOCAL_SIGNATURE:
+            return None
+        name = ensure(offset + ZIP_LOCAL_HEADER.size, name_length).decode('utf-8', errors='ignore')
+        data_start = offset + ZIP_LOCAL_HEADER.size + name_length + extra_length
+
+        if name == DOCX_BODY:
+            length = min(compressed_size or DOCX_RANGE_BYTES, DOCX_RANGE_BYTES)
+            data = ensure(data_start, length)
+            if method == 8:
+                data = zlib.decompressobj(-zlib.MAX_WBITS).decompress(data)
+            elif method != 0:
+                return None
+            xml = _decode_prefix(data)
+            xml = DOCX_PARAGRAPH_RE.sub('<w:t>\n</w:t>', xml)
+            text = html.unescape("".join(DOCX_TEXT_RE.findall(xml)))
+            text = re.sub(r'[ \t]+', ' ', text).strip()
+            return text[:max_chars] or None
+
+        # sizes live in a trailing data descriptor, so we can't tell where the next entry starts
+        if flags & 0x08 and compressed_size == 0:
+            return None
+        offset = data_start + compressed_size
+
+
+# extractor for an uploaded (non-Google) file, or None if we can't read its type
+def extractor_for(file: dict) -> Optional[Callable[[RangeReader, int], Optional[str]]]:
+    mime_type = file.get('mimeType', '')
+    name = file.get('name', '').lower()
+    if mime_type in TEXT_MIME_TYPES or name.endswith(TEXT_EXTENSIONS):
+        return extract_text
+    if mime_type == MIME_TYPE_PDF:
+        return extract_pdf
+    if mime_type == MIME_TYPE_DOCX:
+        return extract_docx
+    return None
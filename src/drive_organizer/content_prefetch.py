@@ -0,0 +1,39 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+DEFAULT_PREFETCH_WORKERS = 4
+
+
+# run `fetch` on each item with a pool of worker threads, ahead of whoever consumes
+# the results. yields (item, result) in input order. at most `max_ahead` items are
+# being fetched or waiting to be consumed at once, so a slow consumer holds the
+# fetchers back instead of piling up results. `items` is only advanced from the
+# consuming thread, so it can do non-thread-safe work (e.g. cache lookups)
+def prefetch(items: Iterable[T], fetch: Callable[[T], R], workers: int = DEFAULT_PREFETCH_WORKERS,
+             max_ahead: Optional[int] = None) -> Iterator[tuple[T, R]]:
+    workers = max(1, workers)
+    max_ahead = max(workers, max_ahead or 2 * workers)
+    items = iter(items)
+    queue = deque()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def fill() -> None:
+            while len(queue) < max_ahead:
+                item = next(items, _DONE)
+                if item is _DONE:
+                    return
+                queue.append((item, pool.submit(fetch, item)))
+
+        fill()
+        while queue:
+            item, future = queue.popleft()
+            # top up before waiting, so the pool stays busy while we block
+            fill()
+            yield item, future.result()
+
+
+_DONE = object()
@@ -1,67 +1,106 @@
-from typing import Optional
-from googleapiclient.discovery import Resource
+import codecs
+import io
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from typing import TYPE_CHECKING, Iterator, Optional
+
+from content_extractors import RangeReader, extractor_for
+
+# only for type hints; importing googleapiclient takes longer than the rest of startup
+if TYPE_CHECKING:
+    from googleapiclient.discovery import Resource
 
 MIME_TYPE_FOLDER = 'application/vnd.google-apps.folder'
 MIME_TYPE_DOCUMENT = 'application/vnd.google-apps.document'
 MIME_TYPE_SPREADSHEET = 'application/vnd.google-apps.spreadsheet'
 MIME_TYPE_PRESENTATION = 'application/vnd.google-apps.presentation'
 
+# largest page the Drive API will return
+MAX_PAGE_SIZE = 1000
+
+# metadata we ask for on every listed file
+FILE_FIELDS = "id, name, mimeType, parents, createdTime, modifiedTime, size, md5Checksum, version"
+
+# text format each native Google file type is exported as
+EXPORT_MIME_TYPES = {
+    MIME_TYPE_DOCUMENT: 'text/plain',
+    # CSV export only covers the first sheet
+    MIME_TYPE_SPREADSHEET: 'text/csv',
+    MIME_TYPE_PRESENTATION: 'text/plain',
+}
+
+# bytes per request when streaming an export; small enough that we stop soon after
+# max_chars without paying for many round trips on short documents
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# stream a download in chunks and stop as soon as max_chars of text have been decoded.
+# the incremental decoder keeps multi-byte characters split across chunks intact.
+# returns (text, bytes downloaded)
+def _download_text(request, max_chars: int, chunk_size: int = EXPORT_CHUNK_SIZE) -> tuple[str, int]:
+    from googleapiclient.http import MediaIoBaseDownload
+
+    buffer = io.BytesIO()
+    downloader = MediaIoBaseDownload(buffer, request, chunksize=chunk_size)
+    # utf-8-sig drops the byte order mark Google puts in front of text exports
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='ignore')
+    parts = []
+    chars = 0
+    downloaded = 0
+    done = False
+
+    while not done and chars < max_chars:
+        _, done = downloader.next_chunk()
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        downloaded += len(chunk)
+        text = decoder.decode(chunk, final=done)
+        parts.append(text)
+        chars += len(text)
+
+    return "".join(parts)[:max_chars], downloaded
+
 # extract text snippet from file content
-def get_file_content_snippet(service: Resource, file: dict, max_chars: int = 500) -> Optional[str]:
+def get_file_content_snippet(service: "Resource", file: dict, max_chars: int = 500) -> Optional[str]:
+    return read_content_snippet(service, file, max_chars)[0] or None
+
+# text snippet from file content, and how many bytes were downloaded for it. the
+# snippet is '' when the file was read but has no text we can find (a scanned PDF,
+# an empty Doc) and None when it couldn't be read at all, so callers know whether
+# trying again later could help
+def read_content_snippet(service: "Resource", file: dict, max_chars: int = 500) -> tuple[Optional[str], int]:
     file_id = file.get('id')
     mime_type = file.get('mimeType', '')
-    file_name = file.get('name', 'Unknown')
-    
+
+    export_type = EXPORT_MIME_TYPES.get(mime_type)
+    # uploads can't be exported, so read just their first few KB
+    extractor = extractor_for(file) if export_type is None else None
+    if export_type is None and extractor is None:
+        return None, 0
+
     try:
-        # google Docs, Sheets, Slides can be exported as plain text
-        if mime_type == MIME_TYPE_DOCUMENT:
-            # export Google Doc as plain text
-            content = service.files().export(
-                fileId=file_id,
-                mimeType='text/plain'
-            ).execute()
-            
-            if isinstance(content, bytes):
-                content = content.decode('utf-8', errors='ignore')
-            
-            return content[:max_chars] if content else None
-            
-        elif mime_type == MIME_TYPE_SPREADSHEET:
-            # export Google Sheet as CSV (1st sheet only)
-            content = service.files().export(
-                fileId=file_id,
-                mimeType='text/csv'
-            ).execute()
-            
-            if isinstance(content, bytes):
-                content = content.decode('utf-8', errors='ignore')
-            
-            return content[:max_chars] if content else None
-            
-        elif mime_type == MIME_TYPE_PRESENTATION:
-            # export Google Slides as plain text
-            content = service.files().export(
-                fileId=file_id,
-                mimeType='text/plain'
-            ).execute()
-            
-            if isinstance(content, bytes):
-                content = content.decode('utf-8', errors='ignore')
-            
-            return content[:max_chars] if content else None
-        
-        return None
-        
+        if export_type is not None:
+            # Google Docs, Sheets and Slides are exported as text
+            request = service.files().export_media(fileId=file_id, mimeType=export_type)
+            content, downloaded = _download_text(request, max_chars)
+        else:
+            reader = RangeReader(service, file_id)
+            content = extractor(reader, max_chars)
+            downloaded = reader.downloaded
+        return content or '', downloaded
+
     except Exception as e:
-        return None
+        return None, 0
 
-# generic function to list files with pagination support
-def list_files(service: Resource, page_size: int = 100, query: Optional[str] = None):
-    all_files = []
+# yield files one page at a time as the pages arrive
+def iter_file_pages(service: "Resource", page_size: int = MAX_PAGE_SIZE, query: Optional[str] = None, order_by: Optional[str] = None,
+                    verbose: bool = True) -> Iterator[list[dict]]:
     page_token = None
+    fetched = 0
     # specify the fields we want to retrieve
-    fields = "nextPageToken, files(id, name, mimeType, parents, createdTime, modifiedTime)"
-    print("Fetching files from Google Drive...")
+    fields = f"nextPageToken, files({FILE_FIELDS})"
+    if verbose:
+        print("Fetching files from Google Drive...")
 
     while True:
         #build API request
@@ -73,43 +112,138 @@ def list_files(service: Resource, page_size: int = 100, query: Optional[str] = N
 
         if query:
             request_params['q'] = query
+        if order_by:
+            request_params['orderBy'] = order_by
         
         # execute the request
         results = service.files().list(**request_params).execute()
         files = results.get('files', [])
-        all_files.extend(files)
+        fetched += len(files)
+        yield files
         # check if there are more pages
         page_token = results.get('nextPageToken')
 
         if not page_token:
             break
 
-        print(f"  Fetched {len(all_files)} files so far...")
+        if verbose:
+            print(f"  Fetched {fetched} files so far...")
 
-    print(f"Total files fetched: {len(all_files)}")
-    return all_files
+    if verbose:
+        print(f"Total files fetched: {fetched}")
+
+# yield files one by one, fetching the next page only when needed
+def iter_files(service: "Resource", page_size: int = MAX_PAGE_SIZE, query: Optional[str] = None,
+               verbose: bool = True) -> Iterator[dict]:
+    for page in iter_file_pages(service, page_size=page_size, query=query, verbose=verbose):
+        yield from page
+
+# generic function to list files with pagination support
+def list_files(service: "Resource", page_size: int = MAX_PAGE_SIZE, query: Optional[str] = None):
+    return list(iter_files(service, page_size=page_size, query=query))
 
 # get all folders in user's drive
-def get_folders(service: Resource):
+def get_folders(service: "Resource"):
     print("Fetching existing folders...")
     # filter to only get folders
     query = f"mimeType = '{MIME_TYPE_FOLDER}' and trashed = false"
     folders = list_files(service, query=query)
     return folders
 
+LOOSE_FILES_QUERY = (
+    "'root' in parents and "
+    f"mimeType != '{MIME_TYPE_FOLDER}' and "
+    "trashed = false"
+)
+
 # get files in root drive
-def get_loose_files(service: Resource):
+def get_loose_files(service: "Resource"):
     print("Finding loose (unorganized) files...")
-    query = (
-        "'root' in parents and "
-        f"mimeType != '{MIME_TYPE_FOLDER}' and "
-        "trashed = false"
-    )
-    loose_files = list_files(service, query=query)
+    loose_files = list_files(service, query=LOOSE_FILES_QUERY)
     return loose_files
 
+ROOT_CHILDREN_QUERY = "'root' in parents and trashed = false"
+
+# run a page iterator one page ahead on a background thread, so page N+1 is
+# downloading while page N is being processed. the iterator's service must not
+# be used by anything else meanwhile
+def prefetch_pages(pages: Iterator[list[dict]]) -> Iterator[list[dict]]:
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        upcoming = pool.submit(next, pages, None)
+        while True:
+            page = upcoming.result()
+            if page is None:
+                return
+            upcoming = pool.submit(next, pages, None)
+            yield page
+
+# list everything in root with one query instead of separate folder and file scans.
+# folders are sorted first, so the complete folder list is known as soon as the first
+# file shows up and the files can be streamed from there. returns (folders, file iterator).
+# pass prefetch_service (a service used by nothing else) to fetch pages one ahead
+def iter_root_inventory(service: "Resource", prefetch_service: Optional["Resource"] = None) -> tuple[list[dict], Iterator[dict]]:
+    print("Scanning root of your Drive...")
+    pages = iter_file_pages(prefetch_service or service, query=ROOT_CHILDREN_QUERY, order_by='folder')
+    if prefetch_service is not None:
+        pages = prefetch_pages(pages)
+
+    folders = []
+    first_files = []
+    for page in pages:
+        split = 0
+        while split < len(page) and page[split].get('mimeType') == MIME_TYPE_FOLDER:
+            split += 1
+        folders.extend(page[:split])
+        if split < len(page):
+            first_files = page[split:]
+            break
+
+    # don't rely on the sort order for safety: a folder listed after the first file
+    # (e.g. one created between pages) must never be handed on as a loose file to move
+    def files() -> Iterator[dict]:
+        for page in chain([first_files], pages):
+            for file in page:
+                if file.get('mimeType') != MIME_TYPE_FOLDER:
+                    yield file
+
+    return folders, files()
+
+# metadata we ask for on every entry of the changes feed
+CHANGE_FIELDS = f"nextPageToken, newStartPageToken, changes(fileId, removed, file({FILE_FIELDS}, trashed))"
+
+# the real id of the root folder; the changes feed reports parents by id, never as 'root'
+def get_root_id(service: "Resource") -> str:
+    return service.files().get(fileId='root', fields='id').execute()['id']
+
+# token marking "now" in the changes feed. take it before a full listing so nothing
+# that changes during the listing is missed
+def get_start_page_token(service: "Resource") -> str:
+    return service.changes().getStartPageToken().execute()['startPageToken']
+
+# every change since `page_token`. returns (changes, token to resume from next time)
+def list_changes(service: "Resource", page_token: str, page_size: int = MAX_PAGE_SIZE) -> tuple[list[dict], str]:
+    changes = []
+    print("Fetching changes since the last run...")
+
+    while True:
+        results = service.changes().list(
+            pageToken=page_token,
+            pageSize=page_size,
+            fields=CHANGE_FIELDS,
+            includeRemoved=True,
+            restrictToMyDrive=True,
+            spaces='drive'
+        ).execute()
+        changes.extend(results.get('changes', []))
+
+        # the last page carries the token for the next run instead of a next page
+        if 'newStartPageToken' in results:
+            print(f"Total changes fetched: {len(changes)}")
+            return changes, results['newStartPageToken']
+        page_token = results['nextPageToken']
+
 # get only top level folders (those in root)
-def get_root_folders(service: Resource):
+def get_root_folders(service: "Resource"):
     print("Fetching top-level fodlers...")
     query = (
         f"mimeType = '{MIME_TYPE_FOLDER}' and "
@@ -0,0 +1,206 @@
+import sqlite3
+from typing import Iterable, Optional
+
+from drive_client import MIME_TYPE_FOLDER, iter_file_pages, get_root_id, get_start_page_token
+
+DEFAULT_MIRROR_PATH = '.drive_organizer_mirror.sqlite'
+
+# bump when the tables change; an older mirror is dropped and rebuilt from a full listing
+SCHEMA_VERSION = 2
+
+ALL_ITEMS_QUERY = "trashed = false"
+
+# no column names are shared with item_parents, so these work unqualified in joins too
+ITEM_COLUMNS = 'id, name, mime_type, created_time, modified_time, size, md5_checksum'
+
+
+# local SQLite copy of the Drive's metadata (every item it has seen, with parents,
+# times, size and md5), plus the changes-feed token it is current as of. a full
+# listing fills it once; later runs apply the changes since the saved token, and
+# root folders and loose files come from indexed local queries
+class DriveMirror:
+    def __init__(self, path: str = DEFAULT_MIRROR_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        if self.conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            self.conn.executescript('''
+                DROP TABLE IF EXISTS items;
+                DROP TABLE IF EXISTS item_parents;
+                DROP TABLE IF EXISTS sync_state;
+            ''')
+            self.conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS items (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                mime_type TEXT NOT NULL,
+                created_time TEXT,
+                modified_time TEXT,
+                size INTEGER,
+                md5_checksum TEXT
+            );
+            -- an item can have several parents, so they get their own table
+            CREATE TABLE IF NOT EXISTS item_parents (
+                item_id TEXT NOT NULL,
+                parent_id TEXT NOT NULL,
+                PRIMARY KEY (item_id, parent_id)
+            );
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_item_parents_parent ON item_parents (parent_id);
+            CREATE INDEX IF NOT EXISTS idx_items_mime_type ON items (mime_type);
+        ''')
+        self.conn.commit()
+
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self.conn.execute('SELECT value FROM sync_state WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: str) -> None:
+        self.conn.execute('INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)', (key, value))
+        self.conn.commit()
+
+    # changes-feed token the mirror is current as of, None before the first full scan
+    def page_token(self) -> Optional[str]:
+        return self._get_state('page_token')
+
+    # only save this once the run that used the mirror has finished, otherwise
+    # files it didn't get to would never be offered again
+    def save_page_token(self, token: str) -> None:
+        self._set_state('page_token', token)
+
+    def root_id(self) -> Optional[str]:
+        return self._get_state('root_id')
+
+    # forget everything and start over from a full listing
+    def reset(self, root_id: str) -> None:
+        self.conn.execute('DELETE FROM items')
+        self.conn.execute('DELETE FROM item_parents')
+        self.conn.execute('DELETE FROM sync_state')
+        self._set_state('root_id', root_id)
+
+    # list every item in the Drive into an empty mirror. returns the changes-feed
+    # token to save once the run is done (taken before the listing, so nothing that
+    # changes during it is missed)
+    def populate(self, service) -> str:
+        self.reset(get_root_id(service))
+        token = get_start_page_token(service)
+        print("Copying your Drive's file list...")
+        for page in iter_file_pages(service, query=ALL_ITEMS_QUERY):
+            self.upsert(page)
+        return token
+
+    # insert or update items from a listing or the changes feed
+    def upsert(self, files: Iterable[dict]) -> None:
+        self._write(files)
+        self.conn.commit()
+
+    def _write(self, files: Iterable[dict]) -> None:
+        files = list(files)
+        self.conn.executemany(
+            f'INSERT OR REPLACE INTO items ({ITEM_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [(f['id'], f.get('name', ''), f.get('mimeType', ''), f.get('createdTime'),
+              f.get('modifiedTime'), int(f['size']) if 'size' in f else None, f.get('md5Checksum'))
+             for f in files]
+        )
+        self.conn.executemany('DELETE FROM item_parents WHERE item_id = ?', [(f['id'],) for f in files])
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO item_parents (item_id, parent_id) VALUES (?, ?)',
+            [(f['id'], parent) for f in files for parent in f.get('parents', [])]
+        )
+
+    def _delete(self, file_id: str) -> None:
+        self.conn.execute('DELETE FROM items WHERE id = ?', (file_id,))
+        self.conn.execute('DELETE FROM item_parents WHERE item_id = ?', (file_id,))
+
+    # bring the mirror up to date with entries from the changes feed. returns the ids
+    # of files (not folders) that are now in root and were added, moved in or edited.
+    # nothing is committed until save_page_token, so a run that stops early (dry run,
+    # cancelled) leaves the mirror as it was and the same files come up next time
+    def apply_changes(self, changes: list[dict]) -> list[str]:
+        root_id = self.root_id()
+        # ordered set, a file can show up in several changes
+        touched = {}
+        for change in changes:
+            f = change.get('file')
+            if change.get('removed') or f is None or f.get('trashed'):
+                self._delete(change['fileId'])
+                touched.pop(change['fileId'], None)
+                continue
+
+            if f.get('mimeType') != MIME_TYPE_FOLDER and root_id in f.get('parents', []):
+                known = self.get(f['id'])
+                if (known is None or root_id not in known['parents']
+                        or (known['name'], known['modifiedTime']) != (f.get('name', ''), f.get('modifiedTime'))):
+                    touched[f['id']] = True
+            else:
+                # a folder, or moved out of root
+                touched.pop(f['id'], None)
+            self._write([f])
+
+        return list(touched)
+
+    # rows of ITEM_COLUMNS in the shape the Drive API returns files
+    def _rows_to_files(self, rows) -> list[dict]:
+        files = {}
+        for row in rows:
+            f = {'id': row[0], 'name': row[1], 'mimeType': row[2], 'createdTime': row[3],
+                 'modifiedTime': row[4], 'parents': []}
+            if row[5] is not None:
+                f['size'] = str(row[5])
+            if row[6] is not None:
+                f['md5Checksum'] = row[6]
+            files[f['id']] = f
+
+        # fill in parents with one query per chunk of items
+        ids = list(files)
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            for item_id, parent_id in self.conn.execute(
+                f'SELECT item_id, parent_id FROM item_parents WHERE item_id IN ({",".join("?" * len(chunk))})',
+                chunk
+            ):
+                files[item_id]['parents'].append(parent_id)
+        return list(files.values())
+
+    # one item by id, or None if the mirror doesn't have it
+    def get(self, file_id: str) -> Optional[dict]:
+        files = self.files_by_id([file_id])
+        return files[0] if files else None
+
+    # items with the given ids (in that order), skipping ids the mirror doesn't have
+    def files_by_id(self, file_ids: list[str]) -> list[dict]:
+        files = {}
+        for start in range(0, len(file_ids), 500):
+            chunk = file_ids[start:start + 500]
+            rows = self.conn.execute(
+                f'SELECT {ITEM_COLUMNS} FROM items WHERE id IN ({",".join("?" * len(chunk))})',
+                chunk
+            ).fetchall()
+            files.update((f['id'], f) for f in self._rows_to_files(rows))
+        return [files[file_id] for file_id in file_ids if file_id in files]
+
+    # items directly inside a folder; folders=True/False keeps only folders/only files
+    def children(self, parent_id: str, folders: Optional[bool] = None) -> list[dict]:
+        query = f'SELECT {ITEM_COLUMNS} FROM item_parents JOIN items ON id = item_id WHERE parent_id = ?'
+        params = [parent_id]
+        if folders is not None:
+            query += ' AND mime_type = ?' if folders else ' AND mime_type != ?'
+            params.append(MIME_TYPE_FOLDER)
+        rows = self.conn.execute(query + ' ORDER BY name', params).fetchall()
+        return self._rows_to_files(rows)
+
+    # folders in root
+    def root_folders(self) -> list[dict]:
+        return self.children(self.root_id(), folders=True)
+
+    # loose files, i.e. everything in root that isn't a folder
+    def root_files(self) -> list[dict]:
+        return self.children(self.root_id(), folders=False)
+
+    # uncommitted changes are dropped, see apply_changes
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,93 @@
+import re
+from typing import Iterable, Union
+
+from folder_registry import FolderRegistry
+from mock_classifier import ClassificationResult
+
+# how alike two folder names must be (0-1) before they are merged
+DEFAULT_SIMILARITY_THRESHOLD = 0.85
+
+# words that number things apart: '101', '2023', 'II', 'iv'
+NUMBERING_RE = re.compile(r'\d|^(?=[ivxlcdm]+$)m*(cm|cd|d?c{0,3})(xc|xl|l?x{0,3})(ix|iv|v?i{0,3})$')
+
+
+# lowercase words of a folder name with a naive plural strip, e.g. 'Biology Notes' -> ['biology', 'note']
+def _name_tokens(name: str) -> list[str]:
+    tokens = re.findall(r'[a-z0-9]+', name.casefold())
+    return [t[:-1] if len(t) > 3 and t.endswith('s') and not t.endswith('ss') else t for t in tokens]
+
+
+# similarity of two folder names between 0 and 1. only the same words (up to plurals)
+# or truncated words count; a close spelling alone doesn't, 'Math 101' vs 'Math 102'
+# and 'Delta Stuff' vs 'Beta Stuff' are different folders
+def folder_similarity(a: str, b: str) -> float:
+    tokens_a = _name_tokens(a)
+    tokens_b = _name_tokens(b)
+    if not tokens_a or not tokens_b:
+        return 0.0
+    if tokens_a == tokens_b:
+        return 1.0
+
+    # same words where one is a truncation of the other: 'Biology Course' vs 'Biology Coursework'.
+    # very short words are left out, 'Car' and 'Careers' are different things, and so
+    # are numbers, years and roman numerals
+    if len(tokens_a) == len(tokens_b) and all(
+        x == y or (min(len(x), len(y)) >= 4 and (x.startswith(y) or y.startswith(x))
+                   and not NUMBERING_RE.search(x) and not NUMBERING_RE.search(y))
+        for x, y in zip(tokens_a, tokens_b)
+    ):
+        return 0.9
+
+    return 0.0
+
+
+# group near-duplicate new folder names. returns {new name: name to use instead},
+# only for names that change. names close to an existing folder merge into that
+# folder; otherwise the most used spelling in each group wins
+def cluster_folder_names(new_folder_counts: dict[str, int],
+                         existing_folders: Union[FolderRegistry, Iterable[str]],
+                         threshold: float = DEFAULT_SIMILARITY_THRESHOLD) -> dict[str, str]:
+    existing = FolderRegistry.of(existing_folders)
+    representatives = list(existing)
+    renames = {}
+
+    # most used names first so they become the representatives
+    for name in sorted(new_folder_counts, key=lambda n: (-new_folder_counts[n], len(n), n)):
+        known = existing.resolve(name)
+        if known is not None:
+            if known != name:
+                renames[name] = known
+            continue
+
+        best, best_score = None, threshold
+        for representative in representatives:
+            score = folder_similarity(name, representative)
+            if score >= best_score:
+                best, best_score = representative, score
+
+        if best is None:
+            representatives.append(name)
+        else:
+            renames[name] = best
+
+    return renames
+
+
+# merge near-duplicate new folders across a finished set of results, rewriting them
+# in place. returns the renames that were applied
+def consolidate_new_folders(results: list[ClassificationResult],
+                            existing_folders: Union[FolderRegistry, Iterable[str]],
+                            threshold: float = DEFAULT_SIMILARITY_THRESHOLD) -> dict[str, str]:
+    existing = FolderRegistry.of(existing_folders)
+
+    counts = {}
+    for result in results:
+        if result.is_new_folder:
+            counts[result.suggested_folder] = counts.get(result.suggested_folder, 0) + 1
+
+    renames = cluster_folder_names(counts, existing, threshold)
+    for result in results:
+        if result.is_new_folder and result.suggested_folder in renames:
+            result.suggested_folder = renames[result.suggested_folder]
+            result.is_new_folder = result.suggested_folder not in existing
+    return renames
@@ -0,0 +1,40 @@
+from typing import Iterable, Iterator, Optional, Union
+
+
+# case-insensitive set of folder names with O(1) lookups.
+# the first spelling added for a name is the one handed back by resolve()
+class FolderRegistry:
+    def __init__(self, folders: Iterable[str] = ()):
+        self._names: list[str] = []
+        self._index: dict[str, str] = {}
+        for folder in folders:
+            self.add(folder)
+
+    # reuse an existing registry, or index a plain list of names
+    @classmethod
+    def of(cls, folders: Union["FolderRegistry", Iterable[str]]) -> "FolderRegistry":
+        if isinstance(folders, cls):
+            return folders
+        return cls(folders)
+
+    # existing spelling of a folder name, or None if we don't know it
+    def resolve(self, name: str) -> Optional[str]:
+        return self._index.get(name.casefold())
+
+    # register a folder name, returns False if it was already known
+    def add(self, name: str) -> bool:
+        key = name.casefold()
+        if key in self._index:
+            return False
+        self._index[key] = name
+        self._names.append(name)
+        return True
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and name.casefold() in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
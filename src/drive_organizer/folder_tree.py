@@ -0,0 +1,114 @@
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, Optional
+
+from drive_client import MIME_TYPE_FOLDER, get_root_id, iter_files
+
+# parent ids per `'<id>' in parents or ...` query; keeps the query string well
+# under Drive's length limit
+IDS_PER_QUERY = 40
+
+# separator of folder paths like 'School/Biology'
+PATH_SEPARATOR = '/'
+
+
+# compact index of the folder tree: one row per folder in parallel lists, with each
+# folder's parent stored as a row number (-1 for folders directly in root)
+class FolderTree:
+    def __init__(self):
+        self.ids: list[str] = []
+        self.names: list[str] = []
+        self.parent = array('i')
+        self.depth = array('b')
+        self._row: dict[str, int] = {}
+        self._children: Optional[dict[int, list[int]]] = None
+        self._paths: Optional[list[str]] = None
+
+    # add a folder below the folder in row `parent` (-1 for root). a folder with
+    # several parents is only kept under the first one seen. returns its row or None
+    def add(self, folder_id: str, name: str, parent: int) -> Optional[int]:
+        if folder_id in self._row:
+            return None
+        row = len(self.ids)
+        self._row[folder_id] = row
+        self.ids.append(folder_id)
+        self.names.append(name)
+        self.parent.append(parent)
+        self.depth.append(0 if parent < 0 else self.depth[parent] + 1)
+        self._children = None
+        self._paths = None
+        return row
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def row_of(self, folder_id: str) -> Optional[int]:
+        return self._row.get(folder_id)
+
+    # rows of the folders directly inside row `parent` (-1 for root)
+    def children(self, parent: int = -1) -> list[int]:
+        if self._children is None:
+            self._children = {}
+            for row, up in enumerate(self.parent):
+                self._children.setdefault(up, []).append(row)
+        return self._children.get(parent, [])
+
+    # 'School/Biology' style path of every folder, by row
+    def paths(self) -> list[str]:
+        if self._paths is None:
+            # parents always come before their children, so one pass is enough
+            self._paths = []
+            for row, name in enumerate(self.names):
+                up = self.parent[row]
+                self._paths.append(name if up < 0 else self._paths[up] + PATH_SEPARATOR + name)
+        return self._paths
+
+    def path(self, row: int) -> str:
+        return self.paths()[row]
+
+    # {path: folder id} for every folder, the destinations the organizer can use
+    def path_ids(self) -> dict[str, str]:
+        return dict(zip(self.paths(), self.ids))
+
+
+# queries for the folders inside each chunk of parent ids
+def _children_queries(parent_ids: list[str], ids_per_query: int) -> Iterator[str]:
+    for start in range(0, len(parent_ids), ids_per_query):
+        chunk = parent_ids[start:start + ids_per_query]
+        parents = " or ".join(f"'{parent_id}' in parents" for parent_id in chunk)
+        yield f"mimeType = '{MIME_TYPE_FOLDER}' and trashed = false and ({parents})"
+
+
+# build the whole folder tree breadth first, one level at a time. the folders of each
+# level are looked up with batched `in parents` queries run `workers` at a time, each
+# thread on its own service from `service_factory`. max_depth=1 only finds the
+# top-level folders, which are always crawled: callers use the tree in place of them
+def crawl_folder_tree(service_factory: Callable, max_depth: Optional[int] = None, workers: int = 4,
+                      ids_per_query: int = IDS_PER_QUERY) -> FolderTree:
+    if max_depth is not None:
+        max_depth = max(1, max_depth)
+    tree = FolderTree()
+    root_id = get_root_id(service_factory())
+
+    def list_children(query: str) -> list[dict]:
+        return list(iter_files(service_factory(), query=query, verbose=False))
+
+    print("Crawling your folder tree...")
+    level = [root_id]
+    depth = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while level and (max_depth is None or depth < max_depth):
+            rows = {root_id: -1} if depth == 0 else {folder_id: tree.row_of(folder_id) for folder_id in level}
+            next_level = []
+            for folders in pool.map(list_children, _children_queries(level, ids_per_query)):
+                for folder in folders:
+                    # attach under whichever of its parents belongs to this level
+                    parent = next((rows[p] for p in folder.get('parents', []) if p in rows), None)
+                    if parent is not None and tree.add(folder['id'], folder['name'], parent) is not None:
+                        next_level.append(folder['id'])
+            depth += 1
+            print(f"  Level {depth}: {len(next_level)} folders")
+            level = next_level
+
+    print(f"Found {len(tree)} folders in total")
+    return tree
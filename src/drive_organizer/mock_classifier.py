@@ -1,6 +1,9 @@
-import re
-from dataclasses import dataclass
-from typing import Optional
+from array import array
+from dataclasses import dataclass, field
+from typing import Iterable, Optional, Union
+
+from folder_registry import FolderRegistry
+from rule_engine import CompiledRules
 
 # represents AI's decision about where a file should go
 @dataclass
@@ -11,6 +14,60 @@ class ClassificationResult:
     is_new_folder: bool 
     confidence: str         
     reasoning: str  
+    # listing metadata carried along so moves don't have to look the file up again
+    parents: Optional[list[str]] = None
+    modified_time: Optional[str] = None
+
+
+# confidence levels stored as small integer codes in columnar results
+CONFIDENCE_LOW = 0
+CONFIDENCE_MEDIUM = 1
+CONFIDENCE_HIGH = 2
+CONFIDENCE_LABELS = ("low", "medium", "high")
+
+# stop memoizing names in a batch after this many distinct ones
+BATCH_MEMO_LIMIT = 100_000
+
+
+# columnar classification of many files: one row per input name, folders interned
+@dataclass
+class BatchClassification:
+    # folder table; rows point into it by index
+    folders: list[str] = field(default_factory=list)
+    folder_is_new: list[bool] = field(default_factory=list)
+    # per-row columns
+    folder_index: array = field(default_factory=lambda: array('i'))
+    confidence: array = field(default_factory=lambda: array('b'))
+    rule_index: array = field(default_factory=lambda: array('i'))  # -1 when no rule matched
+    # rule list the rule indexes refer to
+    rules: list[tuple[str, str]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.folder_index)
+
+    # folder name for a row
+    def folder_of(self, row: int) -> str:
+        return self.folders[self.folder_index[row]]
+
+    # materialize one row as a regular ClassificationResult
+    def to_result(self, row: int, file_id: str, file_name: str) -> ClassificationResult:
+        folder_index = self.folder_index[row]
+        rule_index = self.rule_index[row]
+        if rule_index >= 0:
+            reasoning = f"Matched pattern '{self.rules[rule_index][0]}' in filename"
+        elif self.folders[folder_index].casefold() == "drafts":
+            reasoning = "Untitled document - likely a draft"
+        else:
+            reasoning = "No clear category detected - needs manual review"
+
+        return ClassificationResult(
+            file_id=file_id,
+            file_name=file_name,
+            suggested_folder=self.folders[folder_index],
+            is_new_folder=self.folder_is_new[folder_index],
+            confidence=CONFIDENCE_LABELS[self.confidence[row]],
+            reasoning=reasoning
+        )
 
 
 class MockClassifier:
@@ -114,56 +171,48 @@ class MockClassifier:
         (r'firebase', 'Projects'),
     ]
     
-    def __init__(self):
-        print("✓ Mock Classifier initialized (no API calls)\n")
-        print("  ℹ This uses keyword matching to simulate AI classification.")
-        print("  ℹ Switch to real AI by setting use_mock=False once quota resets.\n")
+    def __init__(self, verbose: bool = True):
+        self._rules: Optional[CompiledRules] = None
+        if verbose:
+            print("✓ Mock Classifier initialized (no API calls)\n")
+            print("  ℹ This uses keyword matching to simulate AI classification.")
+            print("  ℹ Switch to real AI by setting use_mock=False once quota resets.\n")
     
     # classify file using regex
     def classify_file(self,
                       file_name: str,
                       file_id: str,
-                      existing_folders: list[str],
+                      existing_folders: Union[list[str], FolderRegistry],
                       file_content_snippet: Optional[str] = None) -> ClassificationResult:
 
         name_lower = file_name.lower()
+        folders = FolderRegistry.of(existing_folders)
         
         # try to match patterns
         suggested_folder = None
         matched_pattern = None
         match_source = "filename"
         
-        for pattern, folder in self.KEYWORD_RULES:
-            if re.search(pattern, name_lower):
-                suggested_folder = folder
-                matched_pattern = pattern
-                match_source = "filename"
-                break
+        rules = self._compiled_rules()
+        rule_index = rules.first_match(name_lower)
 
         # 2nd pass: if no filename match and content is provided, check content
-        if not suggested_folder and file_content_snippet:
-            content_lower = file_content_snippet.lower()
-            for pattern, folder in self.KEYWORD_RULES:
-                if re.search(pattern, content_lower):
-                    suggested_folder = folder
-                    matched_pattern = pattern
-                    match_source = "file content"
-                    break
+        if rule_index is None and file_content_snippet:
+            rule_index = rules.first_match(file_content_snippet.lower())
+            match_source = "file content"
+
+        if rule_index is not None:
+            matched_pattern, suggested_folder = rules.rules[rule_index]
         
         # check if the suggested folder exists
         if suggested_folder:
-            is_new = True
-            for existing in existing_folders:
-                if existing.lower() == suggested_folder.lower():
-                    suggested_folder = existing 
-                    is_new = False
-                    break
+            existing = folders.resolve(suggested_folder)
             
             return ClassificationResult(
                 file_id=file_id,
                 file_name=file_name,
-                suggested_folder=suggested_folder,
-                is_new_folder=is_new,
+                suggested_folder=existing or suggested_folder,
+                is_new_folder=existing is None,
                 confidence="high" if match_source == "filename" else "medium",
                 reasoning=f"Matched pattern '{matched_pattern}' in {match_source}"
             )
@@ -173,8 +222,8 @@ class MockClassifier:
             return ClassificationResult(
                 file_id=file_id,
                 file_name=file_name,
-                suggested_folder="Drafts",
-                is_new_folder="Drafts" not in existing_folders,
+                suggested_folder=folders.resolve("Drafts") or "Drafts",
+                is_new_folder="Drafts" not in folders,
                 confidence="low",
                 reasoning="Untitled document - likely a draft"
             )
@@ -183,12 +232,89 @@ class MockClassifier:
         return ClassificationResult(
             file_id=file_id,
             file_name=file_name,
-            suggested_folder="To Sort",
-            is_new_folder="To Sort" not in existing_folders,
+            suggested_folder=folders.resolve("To Sort") or "To Sort",
+            is_new_folder="To Sort" not in folders,
             confidence="low",
             reasoning="No clear category detected - needs manual review"
         )
     
+    # classify many file names at once into compact columns (names only, no content).
+    # gives the same folder and confidence as classify_file for each name
+    def classify_batch(self,
+                       names: Iterable[str],
+                       existing_folders: Union[list[str], FolderRegistry]) -> BatchClassification:
+        rules = self._compiled_rules()
+        batch = BatchClassification(rules=rules.rules)
+        folders = FolderRegistry.of(existing_folders)
+
+        # intern each folder once and remember its slot in the folder table
+        folder_slots = {}
+
+        def slot_for(folder: str, is_new: bool) -> int:
+            slot = folder_slots.get(folder)
+            if slot is None:
+                slot = len(batch.folders)
+                folder_slots[folder] = slot
+                batch.folders.append(folder)
+                batch.folder_is_new.append(is_new)
+            return slot
+
+        # folder lookups are resolved once per rule rather than once per file
+        rule_slots = {}
+        drafts_row = None
+        to_sort_row = None
+        memo = {}
+
+        folder_column = batch.folder_index
+        confidence_column = batch.confidence
+        rule_column = batch.rule_index
+
+        for name in names:
+            name_lower = name.lower()
+            row = memo.get(name_lower)
+
+            if row is None:
+                rule_index = rules.first_match(name_lower)
+                if rule_index is not None:
+                    slot = rule_slots.get(rule_index)
+                    if slot is None:
+                        folder = rules.rules[rule_index][1]
+                        existing = folders.resolve(folder)
+                        slot = slot_for(existing or folder, existing is None)
+                        rule_slots[rule_index] = slot
+                    row = (slot, CONFIDENCE_HIGH, rule_index)
+                elif 'untitled' in name_lower:
+                    if drafts_row is None:
+                        existing = folders.resolve("Drafts")
+                        drafts_row = (slot_for(existing or "Drafts", existing is None), CONFIDENCE_LOW, -1)
+                    row = drafts_row
+                else:
+                    if to_sort_row is None:
+                        existing = folders.resolve("To Sort")
+                        to_sort_row = (slot_for(existing or "To Sort", existing is None), CONFIDENCE_LOW, -1)
+                    row = to_sort_row
+
+                if len(memo) < BATCH_MEMO_LIMIT:
+                    memo[name_lower] = row
+
+            folder_column.append(row[0])
+            confidence_column.append(row[1])
+            rule_column.append(row[2])
+
+        return batch
+
+    # compile the rule list once and reuse it until the rules change
+    def _compiled_rules(self) -> CompiledRules:
+        # KEYWORD_RULES is shared by all instances, so a rule added through
+        # another instance also makes this compiled copy stale
+        if self._rules is None or len(self._rules.rules) != len(self.KEYWORD_RULES):
+            self._rules = CompiledRules(self.KEYWORD_RULES)
+        return self._rules
+
+    # identifies the current rule set, e.g. for cache keys
+    def rule_set_version(self) -> str:
+        return self._compiled_rules().version
+
     # add new classification rule
     def add_rule(self, pattern: str, folder: str, priority: int = -1) -> None:
         rule = (pattern, folder)
@@ -196,6 +322,7 @@ class MockClassifier:
             self.KEYWORD_RULES.append(rule)
         else:
             self.KEYWORD_RULES.insert(priority, rule)
+        self._rules = None
     
     # get all patterns that map to specific folder
     def get_rules_for_folder(self, folder: str) -> list[str]:
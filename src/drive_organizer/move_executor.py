@@ -0,0 +1,254 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from mock_classifier import ClassificationResult
+
+# Drive accepts at most 100 calls in one batch request
+MAX_BATCH_SIZE = 100
+
+# statuses worth retrying: rate limits and transient server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+CHANGED_SINCE_LISTING = "file changed since it was listed, left where it is"
+
+
+# outcome of moving one file
+@dataclass
+class MoveOutcome:
+    file_id: str
+    file_name: str
+    folder_name: str
+    ok: bool
+    error: Optional[str] = None
+
+
+# whether a failed sub-request is worth sending again
+def is_retryable(error: Exception) -> bool:
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    if status is None:
+        # no HTTP response at all - a dropped connection or timeout
+        return True
+    status = int(status)
+    if status in RETRYABLE_STATUSES:
+        return True
+    # Drive reports most rate limiting as 403 with a specific reason
+    return status == 403 and any(reason in str(error) for reason in RATE_LIMIT_REASONS)
+
+
+# send requests through Drive batch endpoints, retrying failed ones with exponential backoff.
+# `requests` maps a string key to a function building a fresh request for it (a request
+# can't be re-sent once executed). returns {key: (response, error)} for every key
+def execute_batched(service, requests: dict[str, Callable], max_attempts: int = 5,
+                    base_delay: float = 1.0, batch_size: int = MAX_BATCH_SIZE,
+                    on_result: Optional[Callable[[str, Optional[dict], Optional[Exception]], None]] = None) -> dict:
+    results = {}
+    pending = list(requests)
+    last_errors = {}
+
+    for attempt in range(max_attempts):
+        if not pending:
+            break
+        if attempt:
+            delay = _backoff(attempt, base_delay)
+            print(f"  Retrying {len(pending)} failed requests in {delay:.1f}s...")
+            time.sleep(delay)
+
+        # ordered set of keys to send again
+        retry = {}
+
+        def callback(request_id, response, exception):
+            if exception is None:
+                results[request_id] = (response, None)
+                if on_result:
+                    on_result(request_id, response, None)
+            elif is_retryable(exception):
+                last_errors[request_id] = exception
+                retry[request_id] = True
+            else:
+                results[request_id] = (None, exception)
+                if on_result:
+                    on_result(request_id, None, exception)
+
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            batch = service.new_batch_http_request(callback=callback)
+            for key in chunk:
+                batch.add(requests[key](), request_id=key)
+            try:
+                batch.execute()
+            except Exception as e:
+                # the whole batch request failed, so none of its callbacks ran
+                for key in chunk:
+                    if key not in results and key not in retry:
+                        last_errors[key] = e
+                        retry[key] = True
+
+        pending = list(retry)
+
+    # out of attempts
+    for key in pending:
+        results[key] = (None, last_errors.get(key))
+        if on_result:
+            on_result(key, None, last_errors.get(key))
+
+    return results
+
+
+# seconds to wait before retry number `attempt` (1-based)
+def _backoff(attempt: int, base_delay: float) -> float:
+    return base_delay * (2 ** (attempt - 1)) + random.uniform(0, base_delay)
+
+
+# status of an HTTP error, or None when there was no response
+def _status(error: Optional[Exception]) -> Optional[int]:
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    return int(status) if status is not None else None
+
+
+# move files into their destination folders using batch requests.
+# files are re-parented straight from the parents seen when they were listed; only
+# results without listing metadata get a parents lookup first. when a move is
+# rejected (e.g. the file was moved meanwhile) we re-read the file and skip it if its
+# parents or modifiedTime no longer match the listing, rather than moving it anyway.
+# `moves` is a list of (result, folder name, folder id); outcomes come back in the same order
+def move_files(service, moves: list[tuple[ClassificationResult, str, str]], max_attempts: int = 5) -> list[MoveOutcome]:
+    outcomes: list[Optional[MoveOutcome]] = [None] * len(moves)
+
+    def fail(i: int, error) -> None:
+        result, folder_name, _ = moves[i]
+        outcomes[i] = MoveOutcome(result.file_id, result.file_name, folder_name, False, str(error))
+        print(f"  ✗ {result.file_name} → {folder_name}: {error}")
+
+    # parents as listed, looked up only where the listing didn't carry them
+    current_parents = {}
+    lookups = {}
+    for i, (result, _, _) in enumerate(moves):
+        if result.parents is None:
+            lookups[str(i)] = (lambda file_id=result.file_id: service.files().get(fileId=file_id, fields='parents'))
+        else:
+            current_parents[str(i)] = result.parents
+
+    if lookups:
+        print(f"  Looking up parents for {len(lookups)} files without listing metadata...")
+        for key, (response, error) in execute_batched(service, lookups, max_attempts=max_attempts).items():
+            if error is not None:
+                fail(int(key), error)
+            else:
+                current_parents[key] = response.get('parents', [])
+
+    updates = {}
+    for key, parents in current_parents.items():
+        result, _, folder_id = moves[int(key)]
+        updates[key] = (lambda file_id=result.file_id, add=folder_id, remove=",".join(parents):
+                        service.files().update(fileId=file_id, addParents=add,
+                                               removeParents=remove, fields='id, parents'))
+
+    # rejected moves of files we have listing metadata for, checked below
+    conflicts = {}
+
+    def report(key, response, error):
+        i = int(key)
+        result, folder_name, _ = moves[i]
+        if error is None:
+            outcomes[i] = MoveOutcome(result.file_id, result.file_name, folder_name, True)
+            print(f"  ✓ {result.file_name} → {folder_name}")
+        elif _status(error) in (400, 403) and result.modified_time is not None:
+            conflicts[key] = error
+        else:
+            fail(i, error)
+
+    execute_batched(service, updates, max_attempts=max_attempts, on_result=report)
+
+    if conflicts:
+        checks = {
+            key: (lambda file_id=moves[int(key)][0].file_id:
+                  service.files().get(fileId=file_id, fields='parents, modifiedTime'))
+            for key in conflicts
+        }
+        for key, (response, error) in execute_batched(service, checks, max_attempts=max_attempts).items():
+            result = moves[int(key)][0]
+            if error is not None:
+                fail(int(key), error)
+            elif (response.get('modifiedTime') != result.modified_time
+                  or sorted(response.get('parents', [])) != sorted(current_parents[key])):
+                fail(int(key), CHANGED_SINCE_LISTING)
+            else:
+                fail(int(key), conflicts[key])
+
+    return outcomes
+
+
+# execute one request, retrying transient failures with exponential backoff
+def _execute_with_retry(build_request: Callable, max_attempts: int, base_delay: float = 1.0):
+    for attempt in range(1, max_attempts + 1):
+        try:
+            return build_request().execute()
+        except Exception as e:
+            if attempt == max_attempts or not is_retryable(e):
+                raise
+            time.sleep(_backoff(attempt, base_delay))
+
+
+# move a single file with the same rules as move_files, on the caller's own service
+def _move_one(service, result: ClassificationResult, folder_name: str, folder_id: str, max_attempts: int) -> MoveOutcome:
+    files = service.files()
+    try:
+        parents = result.parents
+        if parents is None:
+            parents = _execute_with_retry(
+                lambda: files.get(fileId=result.file_id, fields='parents'), max_attempts
+            ).get('parents', [])
+
+        try:
+            _execute_with_retry(
+                lambda: files.update(fileId=result.file_id, addParents=folder_id,
+                                     removeParents=",".join(parents), fields='id, parents'),
+                max_attempts
+            )
+        except Exception as e:
+            if _status(e) not in (400, 403) or result.modified_time is None:
+                raise
+            current = _execute_with_retry(
+                lambda: files.get(fileId=result.file_id, fields='parents, modifiedTime'), max_attempts
+            )
+            if (current.get('modifiedTime') != result.modified_time
+                    or sorted(current.get('parents', [])) != sorted(parents)):
+                return MoveOutcome(result.file_id, result.file_name, folder_name, False, CHANGED_SINCE_LISTING)
+            raise
+
+        return MoveOutcome(result.file_id, result.file_name, folder_name, True)
+    except Exception as e:
+        return MoveOutcome(result.file_id, result.file_name, folder_name, False, str(e))
+
+
+# move files with a pool of worker threads, each using its own Drive service from
+# `service_factory` (a shared service isn't thread-safe). progress is printed in
+# plan order even though moves finish out of order
+def move_files_parallel(service_factory: Callable, moves: list[tuple[ClassificationResult, str, str]],
+                        workers: int = 8, max_attempts: int = 5) -> list[MoveOutcome]:
+    outcomes: list[Optional[MoveOutcome]] = [None] * len(moves)
+    next_to_report = 0
+
+    def move(i: int) -> MoveOutcome:
+        result, folder_name, folder_id = moves[i]
+        return _move_one(service_factory(), result, folder_name, folder_id, max_attempts)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(move, i): i for i in range(len(moves))}
+        for future in as_completed(futures):
+            outcomes[futures[future]] = future.result()
+
+            # report every finished move up to the first one still running
+            while next_to_report < len(moves) and outcomes[next_to_report] is not None:
+                outcome = outcomes[next_to_report]
+                if outcome.ok:
+                    print(f"  ✓ [{next_to_report + 1}/{len(moves)}] {outcome.file_name} → {outcome.folder_name}")
+                else:
+                    print(f"  ✗ [{next_to_report + 1}/{len(moves)}] {outcome.file_name} → {outcome.folder_name}: {outcome.error}")
+                next_to_report += 1
+
+    return outcomes
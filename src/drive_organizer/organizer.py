@@ -1,75 +1,228 @@
 import sys
+from itertools import chain
+from array import array
 from typing import Optional
-from dataclasses import dataclass, field
 
 # Import our modules
-from auth import get_drive_service
-from drive_client import get_loose_files, get_root_folders, MIME_TYPE_FOLDER
+from auth import LazyDriveService, ThreadLocalDriveServices, get_credentials
+from drive_client import iter_root_inventory, list_changes, MIME_TYPE_FOLDER
+from drive_mirror import DriveMirror
+from folder_tree import PATH_SEPARATOR as FOLDER_PATH_SEPARATOR, crawl_folder_tree
 from classifier import FileClassifier, ClassificationResult
+from mock_classifier import CONFIDENCE_LABELS, CONFIDENCE_LOW
+from plan_columns import InternTable, PackedStrings
+from classification_cache import ClassificationCache
+from snippet_cache import SnippetCache
+from move_executor import move_files, move_files_parallel
 
-@dataclass
+# the plan, stored column by column so a million files stay small: one row per file
+# (by ordinal) with packed id/name strings and small integer codes, folders and
+# reasoning texts interned in tables. ClassificationResults are only built when the
+# UI or executor asks for a file
 class OrganizationPlan:
-    folder_assignments: dict = field(default_factory=dict)
-    
-    # set of folder names that need to be created
-    new_folders: set = field(default_factory=set)
-    # set of folder names that already exist
-    existing_folders: set = field(default_factory=set)
+    def __init__(self, known_folders: Optional[set] = None):
+        # set of folder names that need to be created
+        self.new_folders: set = set()
+        # set of folder names that already exist
+        self.existing_folders: set = set()
+        # names of the folders that really exist in Drive, when known. they decide
+        # whether a folder is new, whatever individual results claim
+        self.known_folders: set = known_folders or set()
+
+        # folder table. a folder renamed onto another one points at it through _alias,
+        # so its files follow without being touched
+        self._folder_names: list[str] = []
+        self._folder_slot: dict[str, int] = {}
+        self._alias = array('i')
+        self._folder_files = array('q')
+
+        # one row per file ever added. ordinals never change, so the numbers shown
+        # during review stay valid while the plan is edited; a removed file's folder is -1
+        self._file_ids = PackedStrings(indexed=True)
+        self._file_names = PackedStrings()
+        self._folder = array('i')
+        self._confidence = array('b')
+        self._reasoning = array('i')
+        self._reasonings = PackedStrings(indexed=True)
+        self._parents = array('i')  # -1 when not known
+        self._parent_sets = InternTable()
+        self._modified_times = PackedStrings()  # '' when not known
+        self._file_count = 0
+
+    # folder slot a row's folder resolves to after renames
+    def _resolve(self, slot: int) -> int:
+        while self._alias[slot] != slot:
+            self._alias[slot] = self._alias[self._alias[slot]]
+            slot = self._alias[slot]
+        return slot
+
+    # whether `folder` is one we'd have to create. a folder already in the plan keeps
+    # its status, so every file in it agrees
+    def _is_new(self, folder: str, claimed_new: bool) -> bool:
+        if folder in self.new_folders:
+            return True
+        if folder in self.existing_folders:
+            return False
+        if self.known_folders:
+            return folder not in self.known_folders
+        return claimed_new
+
+    # slot of `folder`, adding it to the folder table if it's not in the plan yet
+    def _slot_for(self, folder: str, claimed_new: bool) -> int:
+        slot = self._folder_slot.get(folder)
+        if slot is None:
+            is_new = self._is_new(folder, claimed_new)
+            slot = len(self._folder_names)
+            self._folder_slot[folder] = slot
+            self._folder_names.append(folder)
+            self._alias.append(slot)
+            self._folder_files.append(0)
+            (self.new_folders if is_new else self.existing_folders).add(folder)
+        return slot
+
+    def _assign(self, ordinal: int, slot: int) -> None:
+        self._folder[ordinal] = slot
+        self._folder_files[slot] += 1
+        self._file_count += 1
+
+    # take the file at `ordinal` out of its folder, dropping the folder once it's empty
+    def _unassign(self, ordinal: int) -> None:
+        slot = self._resolve(self._folder[ordinal])
+        self._folder[ordinal] = -1
+        self._folder_files[slot] -= 1
+        self._file_count -= 1
+
+        if not self._folder_files[slot]:
+            folder = self._folder_names[slot]
+            del self._folder_slot[folder]
+            self.new_folders.discard(folder)
+            self.existing_folders.discard(folder)
+
+    def _live_ordinal(self, file_id: str) -> Optional[int]:
+        ordinal = self._file_ids.find(file_id)
+        if ordinal is None or self._folder[ordinal] < 0:
+            return None
+        return ordinal
+
+    # row of a reasoning text; rules and the mock classifier give the same few over and over
+    def _reasoning_row(self, reasoning: str) -> int:
+        row = self._reasonings.find(reasoning)
+        return row if row is not None else self._reasonings.append(reasoning)
 
     # add classification result
     def add_result(self, result: ClassificationResult):
-        folder = result.suggested_folder
-        if folder not in self.folder_assignments:
-            self.folder_assignments[folder] = []
-
-        self.folder_assignments[folder].append(result)
+        confidence = CONFIDENCE_LABELS.index(result.confidence) if result.confidence in CONFIDENCE_LABELS \
+            else CONFIDENCE_LOW
+        parents = self._parent_sets.intern(tuple(result.parents)) if result.parents is not None else -1
 
-        if result.is_new_folder:
-            self.new_folders.add(folder)
+        # a file is only ever in the plan once; re-adding it keeps its ordinal
+        ordinal = self._file_ids.find(result.file_id)
+        if ordinal is None:
+            ordinal = self._file_ids.append(result.file_id)
+            self._file_names.append(result.file_name)
+            self._folder.append(-1)
+            self._confidence.append(confidence)
+            self._reasoning.append(self._reasoning_row(result.reasoning))
+            self._parents.append(parents)
+            self._modified_times.append(result.modified_time or '')
         else:
-            self.existing_folders.add(folder)
+            # the name and listing metadata stay as first added; they don't change mid-run
+            if self._folder[ordinal] >= 0:
+                self._unassign(ordinal)
+            self._confidence[ordinal] = confidence
+            self._reasoning[ordinal] = self._reasoning_row(result.reasoning)
+            self._parents[ordinal] = parents
+        # only look the folder up once the file has left its old one, which may have
+        # been the same folder and been dropped from the plan for being empty
+        self._assign(ordinal, self._slot_for(result.suggested_folder, result.is_new_folder))
 
-    
-    # rename folder in plan
+    # rename folder in plan. renaming onto a folder that's already in the plan merges
+    # them. either way no file rows are touched
     def rename_folder(self, old_name: str, new_name: str):
-        if old_name not in self.folder_assignments:
+        if old_name not in self._folder_slot or old_name == new_name:
             return False
 
-        files = self.folder_assignments.pop(old_name)
+        slot = self._folder_slot.pop(old_name)
+        was_new = old_name in self.new_folders
+        self.new_folders.discard(old_name)
+        self.existing_folders.discard(old_name)
 
-        for result in files:
-            result.suggested_folder = new_name
-        
-        self.folder_assignments[new_name] = files
-
-        if old_name in self.new_folders:
-            self.new_folders.removed(old_name)
-            self.new_folders.add(new_name)
+        target = self._folder_slot.get(new_name)
+        if target is None:
+            is_new = self._is_new(new_name, was_new)
+            self._folder_names[slot] = new_name
+            self._folder_slot[new_name] = slot
+            (self.new_folders if is_new else self.existing_folders).add(new_name)
+        else:
+            self._alias[slot] = target
+            self._folder_files[target] += self._folder_files[slot]
+            self._folder_files[slot] = 0
 
         return True
     
     # remove file from plan or skip organizing it
     def remove_file(self, file_id: str):
-        for folder, files in self.folder_assignments.items():
-            for i, result in enumerate(files):
-                if result.file_id == file_id:
-                    files.pop(i)
-                
-                    if not files:
-                        del self.folder_assignments[folder]
-                        self.new_folders.discard(folder)
-                    return True
-                
-        return False
-    
+        ordinal = self._live_ordinal(file_id)
+        if ordinal is None:
+            return False
+        self._unassign(ordinal)
+        return True
+
+    # send a file to another folder. is_new=True asks for a new folder, but an existing
+    # folder of the same name still wins
+    def move_file(self, file_id: str, folder: str, is_new: bool = False) -> bool:
+        ordinal = self._live_ordinal(file_id)
+        if ordinal is None:
+            return False
+        self._unassign(ordinal)
+        self._assign(ordinal, self._slot_for(folder, is_new))
+        return True
+
+    # the file shown as number `ordinal` during review, built as a ClassificationResult,
+    # or None if it's gone. changing the result doesn't change the plan
+    def file_at(self, ordinal: int) -> Optional[ClassificationResult]:
+        if not 0 <= ordinal < len(self._folder) or self._folder[ordinal] < 0:
+            return None
+        slot = self._resolve(self._folder[ordinal])
+        folder = self._folder_names[slot]
+        parents = self._parents[ordinal]
+        return ClassificationResult(
+            file_id=self._file_ids[ordinal],
+            file_name=self._file_names[ordinal],
+            suggested_folder=folder,
+            is_new_folder=folder in self.new_folders,
+            confidence=CONFIDENCE_LABELS[self._confidence[ordinal]],
+            reasoning=self._reasonings[self._reasoning[ordinal]],
+            parents=list(self._parent_sets[parents]) if parents >= 0 else None,
+            modified_time=self._modified_times[ordinal] or None
+        )
+
+    # (ordinal, result) for every file still in the plan, in the order they were added
+    def files(self):
+        for ordinal in range(len(self._folder)):
+            if self._folder[ordinal] >= 0:
+                yield ordinal, self.file_at(ordinal)
+
+    # names of the folders in the plan, in the order they were first used
+    def folders(self) -> list[str]:
+        return list(self._folder_slot)
+
+    # ordinals of the files going into each folder, with one pass over the rows
+    def ordinals_by_folder(self) -> dict[str, list[int]]:
+        groups = {folder: [] for folder in self._folder_slot}
+        names = [self._folder_names[self._resolve(slot)] for slot in range(len(self._folder_names))]
+        for ordinal, slot in enumerate(self._folder):
+            if slot >= 0:
+                groups[names[slot]].append(ordinal)
+        return groups
+
     # get summary stats about plan
     def get_summary(self) -> dict:
-        total_files = sum(len(files) for files in self.folder_assignments.values())
         return {
-            'total_files': total_files,
+            'total_files': self._file_count,
             'new_folders': len(self.new_folders),
             'existing_folders': len(self.existing_folders),
-            'total_folders': len(self.folder_assignments)
+            'total_folders': len(self._folder_slot)
         }
     
 
@@ -91,11 +244,11 @@ def display_plan(plan: OrganizationPlan) -> None:
         sorted(plan.existing_folders)
     )
     
+    groups = plan.ordinals_by_folder()
     for folder in sorted_folders:
-        if folder not in plan.folder_assignments:
+        if folder not in groups:
             continue
             
-        files = plan.folder_assignments[folder]
         is_new = folder in plan.new_folders
         
         # folder header
@@ -103,7 +256,8 @@ def display_plan(plan: OrganizationPlan) -> None:
         print(f"  {icon} {folder}")
         
         # list files
-        for result in files:
+        for ordinal in groups[folder]:
+            result = plan.file_at(ordinal)
             confidence_icon = {
                 'high': '✓',
                 'medium': '○',
@@ -158,7 +312,7 @@ def interactive_review(plan: OrganizationPlan) -> Optional[OrganizationPlan]:
 # handle interactive folder renaming
 def rename_folder_interactive(plan: OrganizationPlan) -> None:
     print("\n  Available folders:")
-    folders = list(plan.folder_assignments.keys())
+    folders = plan.folders()
     for i, folder in enumerate(folders, 1):
         is_new = "NEW" if folder in plan.new_folders else ""
         print(f"    [{i}] {folder} {is_new}")
@@ -180,23 +334,22 @@ def rename_folder_interactive(plan: OrganizationPlan) -> None:
     except ValueError:
         print("  Invalid input")
 
+# list the files in the plan with the numbers they keep for the whole review
+def print_plan_files(plan: OrganizationPlan) -> None:
+    print("\n  Files in plan:")
+    for ordinal, result in plan.files():
+        print(f"    [{ordinal + 1}] {result.file_name} → {result.suggested_folder}")
+
 # handle interactive file skipping
 def skip_file_interactive(plan: OrganizationPlan) -> None:
-    print("\n  Files in plan:")
-    all_files = []
-    for folder, files in plan.folder_assignments.items():
-        for result in files:
-            all_files.append((result, folder))
-    
-    for i, (result, folder) in enumerate(all_files, 1):
-        print(f"    [{i}] {result.file_name} → {folder}")
+    print_plan_files(plan)
     
     try:
         idx = int(input("\n  Enter file number to skip (0 to cancel): ")) - 1
         if idx == -1:
             return
-        if 0 <= idx < len(all_files):
-            result, _ = all_files[idx]
+        result = plan.file_at(idx)
+        if result is not None:
             plan.remove_file(result.file_id)
             print(f"Removed '{result.file_name}' from plan")
         else:
@@ -207,27 +360,21 @@ def skip_file_interactive(plan: OrganizationPlan) -> None:
 
 # handle interactive file moving to diff folder
 def move_file_interactive(plan: OrganizationPlan) -> None:
-    print("\n  Files in plan:")
-    all_files = []
-    for folder, files in plan.folder_assignments.items():
-        for result in files:
-            all_files.append((result, folder))
-    
-    for i, (result, folder) in enumerate(all_files, 1):
-        print(f"    [{i}] {result.file_name} → {folder}")
+    print_plan_files(plan)
     
     try:
         idx = int(input("\n  Enter file number to move (0 to cancel): ")) - 1
         if idx == -1:
             return
-        if 0 <= idx < len(all_files):
-            result, old_folder = all_files[idx]
+        result = plan.file_at(idx)
+        if result is not None:
+            old_folder = result.suggested_folder
             
             print(f"\n  Moving: {result.file_name}")
             print(f"  Currently assigned to: {old_folder}")
             print("\n  Available destinations:")
             
-            folders = list(plan.folder_assignments.keys())
+            folders = plan.folders()
             for i, folder in enumerate(folders, 1):
                 print(f"    [{i}] {folder}")
             print(f"    [N] Create new folder")
@@ -237,24 +384,14 @@ def move_file_interactive(plan: OrganizationPlan) -> None:
             if dest == 'N':
                 new_folder = input("  New folder name: ").strip()
                 if new_folder:
-                    # remove from old location
-                    plan.remove_file(result.file_id)
-                    # update result and add to new folder
-                    result.suggested_folder = new_folder
-                    result.is_new_folder = True
-                    plan.add_result(result)
+                    plan.move_file(result.file_id, new_folder, is_new=True)
                     print(f"  ✓ Moved to new folder '{new_folder}'")
             else:
                 try:
                     dest_idx = int(dest) - 1
                     if 0 <= dest_idx < len(folders):
                         dest_folder = folders[dest_idx]
-                        # remove from old location
-                        plan.remove_file(result.file_id)
-                        # update result
-                        result.suggested_folder = dest_folder
-                        result.is_new_folder = dest_folder in plan.new_folders
-                        plan.add_result(result)
+                        plan.move_file(result.file_id, dest_folder)
                         print(f"  ✓ Moved to '{dest_folder}'")
                     else:
                         print("  Invalid folder number")
@@ -266,8 +403,34 @@ def move_file_interactive(plan: OrganizationPlan) -> None:
         print("  Invalid input")
 
 
+# create a folder and record its id in folder_ids. with nested=True a path like
+# 'School/Chemistry' is created inside the existing 'School' folder, creating any
+# missing folders along the way
+def create_folder(service, folder_name: str, folder_ids: dict, nested: bool = False) -> str:
+    parts = folder_name.split(FOLDER_PATH_SEPARATOR) if nested else [folder_name]
+    parent_id = None
+    for depth in range(1, len(parts) + 1):
+        path = FOLDER_PATH_SEPARATOR.join(parts[:depth])
+        if path not in folder_ids:
+            folder_metadata = {
+                'name': parts[depth - 1],
+                'mimeType': MIME_TYPE_FOLDER
+            }
+            if parent_id:
+                folder_metadata['parents'] = [parent_id]
+            folder = service.files().create(
+                body=folder_metadata,
+                fields='id'
+            ).execute()
+            folder_ids[path] = folder.get('id')
+        parent_id = folder_ids[path]
+    return parent_id
+
+
 # execute the organization plan
-def execute_plan(service, plan: OrganizationPlan, existing_folder_ids: dict) -> None:
+# with workers > 1 and a service_factory, moves run on a thread pool instead of batch requests
+def execute_plan(service, plan: OrganizationPlan, existing_folder_ids: dict, workers: int = 1, service_factory=None,
+                 nested: bool = False) -> dict:
     print("\n" + "=" * 60)
     print("EXECUTING PLAN")
     print("=" * 60 + "\n")
@@ -281,67 +444,57 @@ def execute_plan(service, plan: OrganizationPlan, existing_folder_ids: dict) ->
         for folder_name in plan.new_folders:
             print(f"Creating '{folder_name}'...", end=" ")
             try:
-                folder_metadata = {
-                    'name': folder_name,
-                    'mimeType': MIME_TYPE_FOLDER
-                }
-                folder = service.files().create(
-                    body=folder_metadata,
-                    fields='id'
-                ).execute()
-                folder_ids[folder_name] = folder.get('id')
+                create_folder(service, folder_name, folder_ids, nested=nested)
                 print("✓")
             except Exception as e:
                 print(f"✗ Error: {e}")
         print()
 
-        # move files to their folders
-        print("Moving files...")
-        success_count = 0
-        error_count = 0
+    # collect every move whose destination folder exists
+    moves = []
+    skipped_count = 0
+    for folder_name, ordinals in plan.ordinals_by_folder().items():
+        folder_id = folder_ids.get(folder_name)
         
-        for folder_name, files in plan.folder_assignments.items():
-            folder_id = folder_ids.get(folder_name)
-            
-            if not folder_id:
-                print(f"Skipping '{folder_name}' - folder ID not found")
-                continue
-            
-            for result in files:
-                print(f"Moving '{result.file_name}' → {folder_name}...", end=" ")
-                try:
-                    # get current parents
-                    file = service.files().get(
-                        fileId=result.file_id,
-                        fields='parents'
-                    ).execute()
-                    
-                    previous_parents = ",".join(file.get('parents', []))
-                    
-                    # move file to new folder
-                    service.files().update(
-                        fileId=result.file_id,
-                        addParents=folder_id,
-                        removeParents=previous_parents,
-                        fields='id, parents'
-                    ).execute()
-                    
-                    print("✓")
-                    success_count += 1
-                    
-                except Exception as e:
-                    print(f"✗ Error: {e}")
-                    error_count += 1
-
-        # summary
-        print("\n" + "-" * 60)
-        print(f" ✓ Successfully moved: {success_count} files")
-        if error_count:
-            print(f" ✗ Errors: {error_count} files")
-        print("-" * 60 + "\n")
+        if not folder_id:
+            print(f"Skipping '{folder_name}' - folder ID not found")
+            skipped_count += len(ordinals)
+            continue
+
+        for ordinal in ordinals:
+            moves.append((plan.file_at(ordinal), folder_name, folder_id))
+
+    if workers > 1 and service_factory is not None:
+        print(f"Moving {len(moves)} files with {workers} workers...")
+        outcomes = move_files_parallel(service_factory, moves, workers=workers)
+    else:
+        # move files to their folders, up to 100 per batch request
+        print(f"Moving {len(moves)} files...")
+        outcomes = move_files(service, moves)
+    success_count = sum(1 for outcome in outcomes if outcome.ok)
+    error_count = len(outcomes) - success_count
+
+    # summary
+    print("\n" + "-" * 60)
+    print(f" ✓ Successfully moved: {success_count} files")
+    if error_count:
+        print(f" ✗ Errors: {error_count} files")
+    if skipped_count:
+        print(f" - Skipped (no folder): {skipped_count} files")
+    print("-" * 60 + "\n")
+
+    return {
+        'moved': success_count,
+        'failed': error_count,
+        'skipped': skipped_count,
+        'outcomes': outcomes
+    }
 
 # main entry point for drive organizer
-def main(use_mock: bool = True, dry_run: bool = False):
+def main(use_mock: bool = True, dry_run: bool = False, use_cache: bool = True, batch_size: int = 20,
+         concurrency: int = 1, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+         consolidate: bool = False, cascade: bool = False, workers: int = 1, incremental: bool = False,
+         nested: bool = False, max_depth: Optional[int] = None, extract_content: bool = False):
     print("=" * 60)
     print(" GOOGLE DRIVE ORGANIZER")
     print("=" * 60 + "\n")
@@ -350,7 +503,10 @@ def main(use_mock: bool = True, dry_run: bool = False):
     print("Step 1: Authenticating with Google Drive...")
     print("-" * 40)
     try:
-        service = get_drive_service()
+        creds = get_credentials()
+        # built on first use
+        service = LazyDriveService(creds)
+        print("Successfully authenticated with Google Drive!\n")
     except Exception as e:
         print(f"Authentication failed: {e}")
         return 1
@@ -358,21 +514,47 @@ def main(use_mock: bool = True, dry_run: bool = False):
     # get existing folders step
     print("Step 2: Scanning existing folders...")
     print("-" * 40)
-    folders = get_root_folders(service)
+    mirror = DriveMirror() if incremental else None
+    next_page_token = None
+    if mirror is not None:
+        if mirror.page_token() is not None:
+            # only look at what changed in root since the last run
+            changes, next_page_token = list_changes(service, mirror.page_token())
+            loose_files = iter(mirror.files_by_id(mirror.apply_changes(changes)))
+        else:
+            print("  No saved sync point yet, copying the file list once...")
+            next_page_token = mirror.populate(service)
+            loose_files = iter(mirror.root_files())
+        folders = mirror.root_folders()
+    else:
+        # one listing of root for both folders and files; it runs on its own service so
+        # the next page can download while we classify
+        folders, loose_files = iter_root_inventory(service, prefetch_service=LazyDriveService(creds))
     folder_names = [f['name'] for f in folders]
     folder_ids = {f['name']: f['id'] for f in folders}
     print(f"  Found {len(folders)} top-level folders\n")
+    if nested:
+        # offer every folder as a 'Parent/Child' path instead of just the top level
+        tree = crawl_folder_tree(ThreadLocalDriveServices(creds), max_depth=max_depth)
+        folder_ids = tree.path_ids()
+        folder_names = list(folder_ids)
+        print()
     
     # get loose files step
     print("Step 3: Finding loose files...")
     print("-" * 40)
-    loose_files = get_loose_files(service)
+    # the rest of the listing streams straight into classification
+    first_file = next(loose_files, None)
     
-    if not loose_files:
+    if first_file is None:
         print(" No loose files found! Your Drive is already organized.")
+        if mirror is not None:
+            mirror.save_page_token(next_page_token)
+            mirror.close()
         return 0
     
-    print(f"  Found {len(loose_files)} files to organize\n")
+    loose_files = chain([first_file], loose_files)
+    print()
     
     # classify files step
     print("Step 4: Classifying files...")
@@ -381,21 +563,49 @@ def main(use_mock: bool = True, dry_run: bool = False):
     mode_str = "mock mode" if use_mock else "AI mode"
     print(f"  Using classifier in {mode_str}\n")
     
-    classifier = FileClassifier(use_mock=use_mock)
-    results = classifier.classify_multiple(loose_files, folder_names)
+    classifier = FileClassifier(use_mock=use_mock, cascade=cascade)
+    cache = ClassificationCache() if use_cache else None
+    # snippets share the classification cache's file and connection
+    snippet_cache = SnippetCache(conn=cache.conn) if use_cache and extract_content else None
+    try:
+        results = classifier.classify_multiple(
+            loose_files, folder_names,
+            extract_content=extract_content,
+            service=service,
+            # content is fetched ahead of the classifier, each thread on its own service
+            service_factory=ThreadLocalDriveServices(creds) if extract_content else None,
+            cache=cache,
+            snippet_cache=snippet_cache,
+            batch_size=batch_size,
+            concurrency=concurrency,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            consolidate=consolidate
+        )
+    finally:
+        # the snippet cache borrows the classification cache's connection, so it goes first
+        if snippet_cache is not None:
+            snippet_cache.close()
+        if cache is not None:
+            cache.close()
     
     # build organization plan step
     print("\nStep 5: Building organization plan...")
     print("-" * 40)
     
-    plan = OrganizationPlan()
+    plan = OrganizationPlan(known_folders=set(folder_ids))
     for result in results:
         plan.add_result(result)
+    # the plan keeps its own compact copy
+    del results
     
     # review step
     if dry_run:
         display_plan(plan)
         print("\n  [DRY RUN MODE - No changes will be made]\n")
+        # keep the old sync point so the next real run still sees these files
+        if mirror is not None:
+            mirror.close()
         return 0
     
     # interactive review
@@ -403,19 +613,49 @@ def main(use_mock: bool = True, dry_run: bool = False):
     
     if approved_plan is None:
         print("\n  Cancelled. No changes were made.\n")
+        if mirror is not None:
+            mirror.close()
         return 0
     
     # execution step
-    execute_plan(service, approved_plan, folder_ids)
+    service_factory = ThreadLocalDriveServices(creds) if workers > 1 else None
+    summary = execute_plan(service, approved_plan, folder_ids, workers=workers, service_factory=service_factory,
+                           nested=nested)
+    if mirror is not None:
+        if summary['failed'] or summary['skipped']:
+            # keep the old sync point so files that didn't move come up again next run
+            print("  Some files weren't moved; they'll be offered again next time.\n")
+        else:
+            # our own moves show up in the changes feed next time and update the mirror then
+            mirror.save_page_token(next_page_token)
+        mirror.close()
     
     print("✨ Organization complete!\n")
     return 0
 
 
+# read a numeric option like `--batch-size 10` from the command line. kind=float
+# allows fractions, e.g. `--rpm 0.5`
+def number_option(name: str, default, kind=int):
+    if name not in sys.argv:
+        return default
+    try:
+        return kind(sys.argv[sys.argv.index(name) + 1])
+    except (IndexError, ValueError):
+        print(f"{name} needs a number, e.g. {name} 10")
+        sys.exit(1)
+
+
 if __name__ == "__main__":
     # parse simple command line arguments
     use_mock = True  # Default to mock mode
     dry_run = False
+    use_cache = True
+    consolidate = False
+    cascade = False
+    incremental = False
+    nested = False
+    read_content = False
     
     if '--ai' in sys.argv:
         use_mock = False
@@ -423,6 +663,26 @@ if __name__ == "__main__":
         dry_run = True
     if '--read-content' in sys.argv:
         read_content = True
+    if '--no-cache' in sys.argv:
+        use_cache = False
+    if '--consolidate' in sys.argv:
+        consolidate = True
+    if '--cascade' in sys.argv:
+        cascade = True
+    if '--incremental' in sys.argv:
+        incremental = True
+    if '--nested' in sys.argv:
+        nested = True
+    batch_size = number_option('--batch-size', 20)
+    concurrency = number_option('--concurrency', 1)
+    requests_per_minute = number_option('--rpm', None, kind=float)
+    tokens_per_minute = number_option('--tpm', None, kind=float)
+    workers = number_option('--workers', 1)
+    max_depth = number_option('--depth', None)
+    # the crawl replaces the top-level folder list, so it has to include at least that level
+    if max_depth is not None and max_depth < 1:
+        print("--depth needs to be at least 1")
+        sys.exit(1)
     if '--help' in sys.argv:
         print("""
 Google Drive Organizer
@@ -433,6 +693,16 @@ Options:
     --ai        Use real AI classifier (requires API quota)
     --dry-run   Show plan but don't execute
     --read-content  Read file contents for smarter classification (AI mode only)
+    --no-cache  Re-classify (and re-read) every file instead of reusing cached results
+    --batch-size N  Files per AI request (default 20, 1 = one request per file)
+    --concurrency N  Send N single-file AI requests at once (replaces batching)
+    --rpm N / --tpm N  Limit concurrent mode to N requests / tokens per minute
+    --consolidate  Classify all files against the current folders, then merge similar new folders
+    --cascade   Try keyword rules first, only ask the AI about files they can't place
+    --workers N  Move files with N parallel connections instead of batch requests
+    --incremental  Only look at files added to root since the last run
+    --nested    Also use folders inside folders, e.g. 'School/Biology'
+    --depth N   With --nested, only look N folder levels deep
     --help      Show this help message
 
 Examples:
@@ -443,4 +713,19 @@ Examples:
 """)
         sys.exit(0)
     
-    sys.exit(main(use_mock=use_mock, dry_run=dry_run))
+    sys.exit(main(
+        use_mock=use_mock,
+        dry_run=dry_run,
+        use_cache=use_cache,
+        batch_size=batch_size,
+        concurrency=concurrency,
+        requests_per_minute=requests_per_minute,
+        tokens_per_minute=tokens_per_minute,
+        consolidate=consolidate,
+        cascade=cascade,
+        workers=workers,
+        incremental=incremental,
+        nested=nested,
+        max_depth=max_depth,
+        extract_content=read_content
+    ))
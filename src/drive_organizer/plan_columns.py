@@ -0,0 +1,80 @@
+from array import array
+from typing import Hashable, Optional
+
+# open-addressing index slots per string, kept at least this sparse
+INDEX_LOAD_FACTOR = 0.5
+
+
+# append-only column of strings packed as UTF-8 into one buffer, with an offset per
+# row instead of a Python object each. with indexed=True, find() looks a string up
+# by value through an open-addressing hash table that is itself just an array
+class PackedStrings:
+    def __init__(self, indexed: bool = False):
+        self._data = bytearray()
+        self._offsets = array('q', [0])
+        # row + 1 per slot, 0 for empty
+        self._index: Optional[array] = array('q', [0] * 8) if indexed else None
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        return self._data[self._offsets[row]:self._offsets[row + 1]].decode('utf-8')
+
+    # add a string, returns its row
+    def append(self, value: str) -> int:
+        row = len(self)
+        # grow before adding the row, so the rehash doesn't already include it
+        if self._index is not None and (row + 1) > len(self._index) * INDEX_LOAD_FACTOR:
+            self._grow_index()
+        self._data += value.encode('utf-8')
+        self._offsets.append(len(self._data))
+        if self._index is not None:
+            self._index[self._free_slot(value)] = row + 1
+        return row
+
+    # row of the first string equal to `value`, or None. only for indexed columns
+    def find(self, value: str) -> Optional[int]:
+        mask = len(self._index) - 1
+        slot = hash(value) & mask
+        encoded = value.encode('utf-8')
+        while self._index[slot]:
+            row = self._index[slot] - 1
+            if self._data[self._offsets[row]:self._offsets[row + 1]] == encoded:
+                return row
+            slot = (slot + 1) & mask
+        return None
+
+    def _free_slot(self, value: str) -> int:
+        mask = len(self._index) - 1
+        slot = hash(value) & mask
+        while self._index[slot]:
+            slot = (slot + 1) & mask
+        return slot
+
+    def _grow_index(self) -> None:
+        self._index = array('q', [0] * (len(self._index) * 2))
+        for row in range(len(self)):
+            self._index[self._free_slot(self[row])] = row + 1
+
+
+# table of distinct values; rows refer to a value by its position in it
+class InternTable:
+    def __init__(self):
+        self.values: list = []
+        self._position: dict = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, position: int):
+        return self.values[position]
+
+    # position of `value`, adding it the first time it is seen
+    def intern(self, value: Hashable) -> int:
+        position = self._position.get(value)
+        if position is None:
+            position = len(self.values)
+            self._position[value] = position
+            self.values.append(value)
+        return position
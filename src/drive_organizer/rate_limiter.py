@@ -0,0 +1,64 @@
+import asyncio
+import time
+from typing import Optional
+
+
+# asyncio token bucket limiting both requests per minute and tokens per minute.
+# either limit can be None to leave it unbounded
+class RateLimiter:
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        # the request bucket must hold at least one whole request, or rates below one
+        # per minute would never let anything through
+        self._request_capacity = max(1.0, float(requests_per_minute or 0))
+        # both buckets start full so the first burst goes out immediately
+        self._request_allowance = self._request_capacity if requests_per_minute else 0.0
+        self._token_allowance = float(tokens_per_minute or 0)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    # top both buckets up for the time passed since the last call
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._request_allowance = min(
+                self._request_capacity,
+                self._request_allowance + elapsed * self.requests_per_minute / 60
+            )
+        if self.tokens_per_minute:
+            self._token_allowance = min(
+                float(self.tokens_per_minute),
+                self._token_allowance + elapsed * self.tokens_per_minute / 60
+            )
+
+    # seconds until one request costing `tokens` fits in both buckets
+    def _wait_time(self, tokens: int) -> float:
+        wait = 0.0
+        if self.requests_per_minute and self._request_allowance < 1:
+            wait = max(wait, (1 - self._request_allowance) * 60 / self.requests_per_minute)
+        if self.tokens_per_minute and self._token_allowance < tokens:
+            wait = max(wait, (tokens - self._token_allowance) * 60 / self.tokens_per_minute)
+        return wait
+
+    # wait until a request of `tokens` tokens is allowed, then charge it.
+    # the lock makes callers queue up in arrival order
+    async def acquire(self, tokens: int = 0) -> None:
+        if self.tokens_per_minute:
+            # a request bigger than a whole minute's budget would otherwise wait forever
+            tokens = min(tokens, int(self.tokens_per_minute))
+
+        async with self._lock:
+            while True:
+                self._refill()
+                wait = self._wait_time(tokens)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+
+            if self.requests_per_minute:
+                self._request_allowance -= 1
+            if self.tokens_per_minute:
+                self._token_allowance -= tokens
@@ -0,0 +1,126 @@
+import hashlib
+import re
+from collections import deque
+from typing import Iterable, Optional
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # python < 3.11
+    import sre_parse
+    import sre_constants
+
+
+# longest literal substring every match of the pattern must contain, or None.
+# only top-level runs of plain characters count: anything optional, repeated
+# or alternated breaks the run, so the literal is always required
+def required_literal(pattern: str) -> Optional[str]:
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return None
+
+    ignore_case = bool(parsed.state.flags & re.IGNORECASE)
+    best = ""
+    run = []
+    for op, arg in list(parsed) + [(None, None)]:
+        if op is sre_constants.LITERAL:
+            run.append(chr(arg))
+            continue
+        if len(run) > len(best):
+            best = "".join(run)
+        run = []
+
+    if not best:
+        return None
+    if ignore_case:
+        # text is lowercased before matching, so only ascii folds predictably
+        if not best.isascii():
+            return None
+        best = best.lower()
+    return best
+
+
+# Aho-Corasick automaton: finds every keyword occurring in a text in one pass
+class AhoCorasick:
+    def __init__(self, keywords: Iterable[tuple[str, int]]):
+        # goto trie, one dict per state; outputs hold the ids ending at that state
+        goto = [{}]
+        outputs = [set()]
+        for keyword, keyword_id in keywords:
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    outputs.append(set())
+                state = nxt
+            outputs[state].add(keyword_id)
+
+        # breadth-first failure links, folded straight into a full transition
+        # table so scanning never has to walk the failure chain
+        fail = [0] * len(goto)
+        delta = [dict(edges) for edges in goto]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state] |= outputs[fail[state]]
+            for ch, target in delta[fail[state]].items():
+                if ch not in goto[state]:
+                    delta[state][ch] = target
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+                queue.append(nxt)
+
+        self._delta = delta
+        self._outputs = [frozenset(out) if out else None for out in outputs]
+
+    # ids of every keyword occurring in the text
+    def find_all(self, text: str) -> set[int]:
+        delta = self._delta
+        outputs = self._outputs
+        found = set()
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            out = outputs[state]
+            if out is not None:
+                found |= out
+        return found
+
+
+# compiled form of a (pattern, folder) rule list, built once per rule set
+class CompiledRules:
+    def __init__(self, rules: list[tuple[str, str]]):
+        self.rules = list(rules)
+        self.patterns = [re.compile(pattern) for pattern, _ in self.rules]
+        # changes whenever a rule is added, removed, reordered or edited
+        self.version = hashlib.sha256(repr(self.rules).encode('utf-8')).hexdigest()[:16]
+        # bound search methods skip re's pattern cache lookup on every call
+        self._searches = [compiled.search for compiled in self.patterns]
+
+        # rules with a required literal are only confirmed when the prefilter
+        # saw that literal; the rest have to be tried on every text
+        keywords = []
+        self._always = set()
+        for i, (pattern, _) in enumerate(self.rules):
+            literal = required_literal(pattern)
+            if literal:
+                keywords.append((literal, i))
+            else:
+                self._always.add(i)
+        self._prefilter = AhoCorasick(keywords)
+
+    # index of the first rule (in list order) matching anywhere in the text, or None
+    def first_match(self, text: str) -> Optional[int]:
+        candidates = self._prefilter.find_all(text)
+        if self._always:
+            candidates |= self._always
+
+        searches = self._searches
+        for i in sorted(candidates):
+            if searches[i](text):
+                return i
+        return None
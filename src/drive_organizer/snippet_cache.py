@@ -0,0 +1,105 @@
+import sqlite3
+import time
+import zlib
+from typing import Optional
+
+from classification_cache import DEFAULT_CACHE_PATH, CacheStore
+
+# total size of stored snippets before the least recently used ones are dropped
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+
+# snippets shorter than this aren't worth compressing
+MIN_COMPRESS_BYTES = 128
+
+
+# what identifies one version of a file's content: its modifiedTime, md5Checksum and
+# version number, whichever the listing carried. None when there's nothing to go on
+def content_version(file: dict) -> Optional[str]:
+    parts = [file.get('modifiedTime'), file.get('md5Checksum'), file.get('version')]
+    if not any(parts):
+        return None
+    return "|".join(part or "" for part in parts)
+
+
+# persistent cache of content snippets so unchanged files aren't exported again.
+# lives next to the classification cache, one row per file; a row only counts as a
+# hit while the file's content version still matches. stays under max_bytes by
+# evicting least recently used rows, and zlib-compresses snippets when compress=True.
+# pass the ClassificationCache's connection as `conn` when both are open at once
+class SnippetCache(CacheStore):
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES, compress: bool = True,
+                 conn: Optional[sqlite3.Connection] = None):
+        super().__init__(path, conn)
+        self.max_bytes = max_bytes
+        self.compress = compress
+
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS snippets (
+                file_id TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                data BLOB NOT NULL,
+                compressed INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_snippets_last_used ON snippets (last_used)')
+        self.conn.commit()
+        self._bytes = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM snippets').fetchone()[0]
+
+    # cached snippet for this version of the file ('' if it's known to have no text), or None
+    def get(self, file: dict) -> Optional[str]:
+        version = content_version(file)
+        row = self.conn.execute(
+            'SELECT version, data, compressed FROM snippets WHERE file_id = ?', (file.get('id', ''),)
+        ).fetchone()
+        if row is None or version is None or row[0] != version:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.conn.execute('UPDATE snippets SET last_used = ? WHERE file_id = ?', (time.time(), file.get('id', '')))
+        self._note_write()
+        data = zlib.decompress(row[1]) if row[2] else row[1]
+        return data.decode('utf-8')
+
+    # store a snippet ('' for a file with no text), replacing any older version of the same file
+    def put(self, file: dict, snippet: str) -> None:
+        version = content_version(file)
+        if version is None:
+            return
+
+        data = snippet.encode('utf-8')
+        compressed = False
+        if self.compress and len(data) >= MIN_COMPRESS_BYTES:
+            packed = zlib.compress(data)
+            if len(packed) < len(data):
+                data, compressed = packed, True
+
+        old = self.conn.execute('SELECT size FROM snippets WHERE file_id = ?', (file['id'],)).fetchone()
+        self.conn.execute(
+            'INSERT OR REPLACE INTO snippets (file_id, version, data, compressed, size, last_used) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (file['id'], version, data, int(compressed), len(data), time.time())
+        )
+        self._bytes += len(data) - (old[0] if old else 0)
+        if self._bytes > self.max_bytes:
+            self._evict()
+        self._note_write()
+
+    # drop least recently used snippets until we're back under max_bytes, with a
+    # little headroom so we don't run this on every insert
+    def _evict(self) -> None:
+        target = self.max_bytes * 9 // 10
+        freed = 0
+        doomed = []
+        for file_id, size in self.conn.execute('SELECT file_id, size FROM snippets ORDER BY last_used'):
+            if self._bytes - freed <= target:
+                break
+            doomed.append((file_id,))
+            freed += size
+        self.conn.executemany('DELETE FROM snippets WHERE file_id = ?', doomed)
+        self._bytes -= freed
+
+    def _size_stats(self) -> dict:
+        return {'bytes': self._bytes}